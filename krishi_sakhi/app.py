@@ -1,5 +1,10 @@
 # app.py – Main Multi-Page App Entry (Fixed for Session State)
 import streamlit as st
+
+from utils.warmup import start_warmup
+
+warmup = start_warmup()  # Translator, clients and heavy imports load in the background (once per server)
+
 if 'user' in st.session_state:
     st.write(f"Debug: Session user type = {type(st.session_state['user'])}, value = {st.session_state['user']}")
 # Page Config (Applies to all pages)
@@ -22,6 +27,16 @@ with st.sidebar:
     
     # Optional: Version or Credits
     st.info("Version 1.0 | Built with Streamlit & HuggingFace")
+
+    # Readiness (warm-up runs in the background; nothing waits on it)
+    readiness = warmup.status()
+    if readiness['state'] == 'warming':
+        st.caption(f"⏳ Getting ready: loading {readiness['running'] or 'models'} ({readiness['elapsed_s']:.0f}s)...")
+    elif readiness['state'] == 'degraded':
+        failed = [name for name, task in readiness['tasks'].items() if task['state'] == 'failed']
+        st.caption(f"⚠️ Ready, without: {', '.join(failed)}")
+    elif readiness['state'] == 'ready':
+        st.caption("✅ Ready")
     
     # Safe User Display (Fixed: Check if user exists)
     if 'user' in st.session_state and st.session_state.user is not None:
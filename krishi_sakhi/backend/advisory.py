@@ -0,0 +1,145 @@
+# backend/advisory.py – Offline Advisory Knowledge Base (Crop × Pest × Season × Soil, BM25-Ranked)
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+
+KB_PATH = os.getenv('KRISHI_KB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'advisory_kb.json'))
+KB_MIN_COVERAGE = float(os.getenv('KRISHI_KB_MIN_COVERAGE', '0.6'))  # Share of query terms a fast-path answer must cover
+KB_MIN_SCORE = float(os.getenv('KRISHI_KB_MIN_SCORE', '3.0'))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset(
+    'a an the to for of in on my our your i we is are be do does did what how when which why '
+    'should can could please tell me about with and or at this that it its there any some from '
+    'crop crops plant plants farm field help problem issue use using get'.split()
+)
+
+# Kerala seasons by month: SW monsoon Jun–Sep, NE monsoon/post-monsoon Oct–Jan, summer Feb–May
+_SEASON_BY_MONTH = {m: 'monsoon' for m in (6, 7, 8, 9)}
+_SEASON_BY_MONTH.update({m: 'post-monsoon' for m in (10, 11, 12, 1)})
+_SEASON_BY_MONTH.update({m: 'summer' for m in (2, 3, 4, 5)})
+
+
+def _stem(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    return [_stem(w) for w in _WORD_RE.findall((text or '').lower()) if w not in _STOPWORDS]
+
+
+def season_for(month=None):
+    return _SEASON_BY_MONTH[month or datetime.now().month]
+
+
+def _field(profile, name):
+    if profile is None:
+        return None
+    return profile.get(name) if hasattr(profile, 'get') else getattr(profile, name, None)
+
+
+def format_entry(entry):
+    """Entry as numbered steps, the same shape the LLM is asked to produce."""
+    steps = ' '.join(f"{i}. {step}" for i, step in enumerate(entry['steps'], start=1))
+    return f"{entry['title']}: {steps}"
+
+
+class AdvisoryKB:
+    """
+    Curated guidance ranked with BM25 over title/topic/keywords/steps, then
+    nudged by the farmer's profile: entries for another crop are demoted,
+    matching season and soil get a small boost. Pure Python; a few hundred
+    entries search in well under a millisecond.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.docs = []
+        for entry in entries:
+            # Title, topic and keywords count twice: they say what the entry is about
+            about = ' '.join([entry['title'], entry['topic'], entry.get('keywords', ''), ' '.join(entry['crops'])])
+            self.docs.append(Counter(tokenize(about) * 2 + tokenize(' '.join(entry['steps']))))
+        self.avg_len = sum(sum(d.values()) for d in self.docs) / max(len(self.docs), 1)
+        df = Counter(term for doc in self.docs for term in doc)
+        n = len(self.docs)
+        self.idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+        self.crop_terms = [set(tokenize(' '.join(e['crops']))) - {'any'} for e in entries]
+
+    @classmethod
+    def load(cls, path=KB_PATH):
+        with open(path, encoding='utf-8') as src:
+            return cls(json.load(src))
+
+    def _bm25(self, terms, doc):
+        length = sum(doc.values())
+        score = 0.0
+        for term in terms:
+            tf = doc.get(term)
+            if tf:
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / self.avg_len)
+                score += self.idf[term] * tf * (BM25_K1 + 1) / norm
+        return score
+
+    def search(self, query, profile=None, limit=3, month=None):
+        """Ranked hits: dicts with entry, score, coverage (share of query terms matched) and crop_match."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        profile_crops = set(tokenize(str(_field(profile, 'crop') or '')))
+        profile_soil = set(tokenize(str(_field(profile, 'soil') or '')))
+        season = season_for(month)
+        hits = []
+        for entry, doc, crops in zip(self.entries, self.docs, self.crop_terms):
+            score = self._bm25(terms, doc)
+            if score <= 0:
+                continue
+            asked_crop = crops & set(terms)
+            crop_match = not crops or bool(crops & profile_crops) or bool(asked_crop)
+            if not crop_match:
+                score *= 0.5  # Another crop's advice only wins on a much better term match
+            if season in entry['season']:
+                score *= 1.1
+            if any(s.startswith(p) or p.startswith(s) for s in entry['soils'] for p in profile_soil):
+                score *= 1.05
+            coverage = sum(1 for t in terms if t in doc) / len(terms)
+            hits.append({'entry': entry, 'score': score, 'coverage': coverage, 'crop_match': crop_match})
+        hits.sort(key=lambda h: h['score'], reverse=True)
+        return hits[:limit]
+
+    def answer(self, query, profile=None, min_coverage=KB_MIN_COVERAGE, min_score=KB_MIN_SCORE):
+        """Best hit if it is confident enough to skip the LLM entirely, else None."""
+        if len(set(tokenize(query))) < 2:
+            return None  # One-word questions are too vague to answer without the LLM
+        hits = self.search(query, profile, limit=1)
+        if hits and hits[0]['crop_match'] and hits[0]['coverage'] >= min_coverage and hits[0]['score'] >= min_score:
+            return hits[0]
+        return None
+
+    def context(self, query, profile=None, limit=2):
+        """Grounding text for the LLM prompt: the top entries as compact numbered guidance."""
+        hits = self.search(query, profile, limit)
+        return '\n'.join(f"- {format_entry(h['entry'])}" for h in hits if h['crop_match'] or h['coverage'] >= KB_MIN_COVERAGE)
+
+
+_kb = None
+_kb_lock = threading.Lock()
+
+
+def get_knowledge_base():
+    global _kb
+    if _kb is None:
+        with _kb_lock:
+            if _kb is None:
+                _kb = AdvisoryKB.load()
+    return _kb
@@ -0,0 +1,191 @@
+# backend/archive.py – Archive Old Queries to Monthly gzip JSONL + Incremental VACUUM
+# CLI: python -m backend.archive --days 180
+import argparse
+import glob
+import gzip
+import heapq
+import json
+import os
+import re
+from datetime import datetime, timedelta
+
+from backend.connection import get_pool
+from backend.search import search_queries
+
+ARCHIVE_DIR = os.getenv('KRISHI_ARCHIVE_DIR', 'archive')
+ARCHIVE_AFTER_DAYS = int(os.getenv('KRISHI_ARCHIVE_AFTER_DAYS', '180'))
+
+_PARTITION_RE = re.compile(r'queries-(\d{4})-(\d{2})\.jsonl\.gz$')
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def partition_path(created_at, archive_dir=ARCHIVE_DIR):
+    # created_at is SQLite's 'YYYY-MM-DD HH:MM:SS' (UTC); partition by month
+    month = (created_at or '0000-00')[:7]
+    return os.path.join(archive_dir, f'queries-{month}.jsonl.gz')
+
+
+def _append_partition(path, rows):
+    # Each call appends one gzip member; multi-member files read back as one stream
+    with gzip.open(path, 'at', encoding='utf-8') as out:
+        for row in rows:
+            out.write(json.dumps(row, ensure_ascii=False) + '\n')
+        out.flush()
+        os.fsync(out.fileno())
+
+
+def _ensure_incremental_vacuum(conn):
+    # auto_vacuum can only change on an empty db or via a full VACUUM; do that once
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+
+
+def archive_queries(older_than_days=ARCHIVE_AFTER_DAYS, archive_dir=ARCHIVE_DIR, batch_size=1000, path=None):
+    """
+    Move queries older than `older_than_days` out of the hot database into
+    monthly partitions, then return freed pages to the filesystem.
+    Each batch is written and fsync'd to its archive files before the rows are
+    deleted, so a crash can at worst leave a row in both places (readers de-duplicate by id).
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).strftime('%Y-%m-%d %H:%M:%S')
+    pool = get_pool(path)
+    moved, partitions, last_id = 0, set(), 0
+
+    while True:
+        with pool.connection() as conn:
+            # Walk the rowid order instead of sorting by created_at: one pass over the table in total
+            rows = conn.execute(
+                'SELECT id, farmer_id, query, response, created_at FROM queries '
+                'WHERE id > ? AND created_at < ? ORDER BY id LIMIT ?',
+                (last_id, cutoff, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            by_partition = {}
+            for r in rows:
+                record = {'id': r[0], 'farmer_id': r[1], 'query': r[2], 'response': r[3], 'created_at': r[4]}
+                by_partition.setdefault(partition_path(r[4], archive_dir), []).append(record)
+            for part, records in by_partition.items():
+                _append_partition(part, records)
+                partitions.add(part)
+            conn.executemany('DELETE FROM queries WHERE id = ?', [(r[0],) for r in rows])
+        moved += len(rows)
+        last_id = rows[-1][0]
+
+    freed = 0
+    with pool.connection() as conn:
+        if moved:
+            conn.execute("INSERT INTO queries_fts (queries_fts) VALUES ('optimize')")
+            conn.commit()
+        _ensure_incremental_vacuum(conn)
+        freed = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        conn.execute('PRAGMA incremental_vacuum')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')  # Let the main file actually shrink
+    return {'moved': moved, 'partitions': sorted(partitions), 'pages_freed': freed, 'cutoff': cutoff}
+
+
+def list_partitions(archive_dir=ARCHIVE_DIR, since=None, until=None):
+    """Partition files, newest month first; since/until ('YYYY-MM' or dates) prune by file name."""
+    parts = []
+    for name in glob.glob(os.path.join(archive_dir, 'queries-*.jsonl.gz')):
+        match = _PARTITION_RE.search(name)
+        if not match:
+            continue
+        month = f'{match.group(1)}-{match.group(2)}'
+        if (since and month < since[:7]) or (until and month > until[:7]):
+            continue
+        parts.append((month, name))
+    return [name for _, name in sorted(parts, reverse=True)]
+
+
+def _in_range(created_at, since=None, until=None):
+    # Prefix compare, so 'YYYY-MM' and 'YYYY-MM-DD' bounds both work (inclusive)
+    created_at = created_at or ''
+    return (not since or created_at[:len(since)] >= since) and (not until or created_at[:len(until)] <= until)
+
+
+def _scan_partition(part, farmer_id=None, since=None, until=None):
+    """Matching rows of one partition in file (oldest-first) order, read line by line."""
+    # Rows are written by json.dumps with fixed key order, so a farmer's rows all contain this
+    # exact text; other farmers' lines are skipped without being parsed
+    needle = f'"farmer_id": {json.dumps(farmer_id)},' if farmer_id is not None else None
+    seen = set()
+    with gzip.open(part, 'rt', encoding='utf-8') as src:
+        for line in src:
+            if not line.strip() or (needle and needle not in line):
+                continue
+            row = json.loads(line)
+            if row['id'] in seen:  # Crash-retry duplicate
+                continue
+            if farmer_id is not None and row['farmer_id'] != farmer_id:
+                continue
+            if not _in_range(row.get('created_at'), since, until):
+                continue
+            seen.add(row['id'])
+            yield row
+
+
+def iter_archived_queries(farmer_id=None, archive_dir=ARCHIVE_DIR, since=None, until=None, newest_first=True):
+    """
+    Stream archived rows (dicts), newest partition first, optionally for one farmer
+    and within since/until. Months outside the range are never opened. With
+    newest_first the matches of each month are reversed, which holds them (not the
+    whole file) in memory; pass False to stream in file order.
+    """
+    for part in list_partitions(archive_dir, since, until):
+        rows = _scan_partition(part, farmer_id, since, until)
+        if newest_first:
+            rows = reversed(list(rows))
+        yield from rows
+
+
+def _overlap_score(terms, row):
+    question = set(_TOKEN_RE.findall((row.get('query') or '').lower()))
+    answer = set(_TOKEN_RE.findall((row.get('response') or '').lower()))
+    return sum(2.0 if t in question else 1.0 if t in answer else 0.0 for t in terms) / len(terms)
+
+
+def _rank_key(row):
+    return row['score'], row.get('created_at') or ''
+
+
+def search_all(text, farmer_id=None, limit=5, archive_dir=ARCHIVE_DIR, since=None, until=None):
+    """
+    Search hot (FTS5) and archived partitions together. Hot candidates come from
+    BM25; both sets are then ranked on one scale (question/answer term overlap)
+    so archived answers can outrank recent ones.
+    """
+    terms = list(dict.fromkeys(_TOKEN_RE.findall((text or '').lower())))
+    if not terms:
+        return []
+    candidates = {}
+    for row in search_queries(text, limit=limit * 4, farmer_id=farmer_id):
+        row['score'], row['archived'] = _overlap_score(terms, row), False
+        candidates[row['id']] = row
+
+    def archived():
+        for row in iter_archived_queries(farmer_id, archive_dir, since, until, newest_first=False):
+            if row['id'] not in candidates:
+                row['score'], row['archived'] = _overlap_score(terms, row), True
+                if row['score'] > 0:
+                    yield row
+
+    # Only the best `limit` archived rows are ever held, however many partitions are scanned
+    best_archived = heapq.nlargest(limit, archived(), key=_rank_key)
+    return heapq.nlargest(limit, list(candidates.values()) + best_archived, key=_rank_key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old queries and compact the hot database")
+    parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS, help="Archive queries older than this many days")
+    parser.add_argument('--dir', default=ARCHIVE_DIR, help="Archive directory")
+    args = parser.parse_args(argv)
+    result = archive_queries(args.days, args.dir)
+    print(f"Archived {result['moved']} queries older than {result['cutoff']} into {len(result['partitions'])} partition(s); "
+          f"reclaimed {result['pages_freed']} pages")
+
+
+if __name__ == '__main__':
+    main()
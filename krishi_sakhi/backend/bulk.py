@@ -0,0 +1,209 @@
+# backend/bulk.py – Streaming Bulk Farmer Import / Table Export (CSV or JSONL)
+# CLI: python -m backend.bulk import cooperative.csv
+#      python -m backend.bulk export farmers farmers.jsonl
+import argparse
+import csv
+import json
+import sys
+from dataclasses import dataclass, field
+
+from backend.connection import get_pool
+from backend.records import FARMER_FIELDS
+
+IMPORT_COLUMNS = tuple(f for f in FARMER_FIELDS if f not in ('id', 'created_at'))
+REQUIRED_FIELDS = ('username', 'name', 'phone')
+INT_FIELDS = ('age', 'experience')
+FLOAT_FIELDS = ('lat', 'lon', 'farm_size')
+EXPORT_TABLES = ('farmers', 'queries')
+
+INSERT_FARMER = (
+    f"INSERT OR IGNORE INTO farmers ({', '.join(IMPORT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(IMPORT_COLUMNS))})"
+)
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    duplicates: int = 0
+    errors: list = field(default_factory=list)  # [(line_no, message)]
+
+    @property
+    def rejected(self):
+        return len(self.errors)  # Duplicates are reported as errors too
+
+
+def _detect_format(name, fmt):
+    if fmt:
+        return fmt
+    return 'jsonl' if str(name).lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def _iter_records(fileobj, fmt):
+    """Yield (line_no, dict) one record at a time."""
+    if fmt == 'csv':
+        reader = csv.DictReader(fileobj)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_no, line in enumerate(fileobj, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, ValueError(f"invalid JSON: {e.msg}")
+            continue
+        yield line_no, record if isinstance(record, dict) else ValueError("expected a JSON object")
+
+
+def validate_farmer(record):
+    """Return the INSERT parameter tuple for one record, or raise ValueError."""
+    values = {}
+    for name in IMPORT_COLUMNS:
+        value = record.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '':
+                value = None
+        if value is not None and name in INT_FIELDS:
+            try:
+                value = int(float(value))
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be a whole number, got {value!r}")
+        elif value is not None and name in FLOAT_FIELDS:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be a number, got {value!r}")
+        values[name] = value
+
+    missing = [name for name in REQUIRED_FIELDS if not values[name]]
+    if missing:
+        raise ValueError(f"missing required field(s): {', '.join(missing)}")
+    if values['lat'] is not None and not -90 <= values['lat'] <= 90:
+        raise ValueError(f"lat out of range: {values['lat']}")
+    if values['lon'] is not None and not -180 <= values['lon'] <= 180:
+        raise ValueError(f"lon out of range: {values['lon']}")
+    if values['location_en'] is None:
+        values['location_en'] = values['location_ml']
+    return tuple(values[name] for name in IMPORT_COLUMNS)
+
+
+def _insert_chunk(pool, chunk, report):
+    # chunk: [(line_no, username, params)]; one transaction per chunk
+    usernames = [username for _, username, _ in chunk]
+    with pool.connection() as conn:
+        placeholders = ', '.join('?' * len(usernames))
+        existing = {row[0] for row in conn.execute(
+            f'SELECT username FROM farmers WHERE username IN ({placeholders})', usernames
+        )}
+        rows = []
+        for line_no, username, params in chunk:
+            if username in existing:
+                report.duplicates += 1
+                report.errors.append((line_no, f"username '{username}' already exists"))
+            else:
+                rows.append(params)
+        # rowcount (unlike total_changes) excludes rows written by index triggers
+        inserted = conn.executemany(INSERT_FARMER, rows).rowcount if rows else 0
+    report.inserted += inserted
+    if len(rows) > inserted:  # Lost a race with a concurrent insert of the same username
+        report.duplicates += len(rows) - inserted
+        report.errors.append((chunk[0][0], f"{len(rows) - inserted} row(s) skipped: username inserted concurrently"))
+
+
+def import_farmers(source, fmt=None, chunk_size=500, path=None):
+    """
+    Stream farmer records from a CSV/JSONL path or open text file into `farmers`.
+    Rows are validated individually; bad rows and existing usernames are
+    reported in ImportReport.errors instead of aborting the import.
+    """
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        with open(source, newline='', encoding='utf-8') as fileobj:
+            return import_farmers(fileobj, _detect_format(source, fmt), chunk_size, path)
+
+    fmt = _detect_format(getattr(source, 'name', ''), fmt)
+    pool = get_pool(path)
+    report = ImportReport()
+    seen = set()
+    chunk = []
+    for line_no, record in _iter_records(source, fmt):
+        if isinstance(record, Exception):
+            report.errors.append((line_no, str(record)))
+            continue
+        try:
+            params = validate_farmer(record)
+        except ValueError as e:
+            report.errors.append((line_no, str(e)))
+            continue
+        username = params[0]
+        if username in seen:
+            report.duplicates += 1
+            report.errors.append((line_no, f"username '{username}' repeated in file"))
+            continue
+        seen.add(username)
+        chunk.append((line_no, username, params))
+        if len(chunk) >= chunk_size:
+            _insert_chunk(pool, chunk, report)
+            chunk = []
+    if chunk:
+        _insert_chunk(pool, chunk, report)
+    return report
+
+
+def export_table(table, dest, fmt=None, batch_size=1000, path=None):
+    """Stream `farmers` or `queries` to a CSV/JSONL path or open text file in id order. Returns row count."""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"table must be one of {EXPORT_TABLES}")
+    if isinstance(dest, (str, bytes)) or hasattr(dest, '__fspath__'):
+        with open(dest, 'w', newline='', encoding='utf-8') as fileobj:
+            return export_table(table, fileobj, _detect_format(dest, fmt), batch_size, path)
+
+    fmt = _detect_format(getattr(dest, 'name', ''), fmt)
+    count = 0
+    with get_pool(path).connection() as conn:
+        cursor = conn.execute(f'SELECT * FROM {table} ORDER BY id')
+        columns = [col[0] for col in cursor.description]
+        writer = csv.writer(dest) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(columns)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if writer:
+                writer.writerows(rows)
+            else:
+                dest.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows)
+            count += len(rows)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk farmer import / table export")
+    sub = parser.add_subparsers(dest='command', required=True)
+    imp = sub.add_parser('import', help="Import farmers from CSV/JSONL")
+    imp.add_argument('source')
+    imp.add_argument('--format', choices=('csv', 'jsonl'))
+    imp.add_argument('--chunk-size', type=int, default=500)
+    exp = sub.add_parser('export', help="Export a table to CSV/JSONL")
+    exp.add_argument('table', choices=EXPORT_TABLES)
+    exp.add_argument('dest')
+    exp.add_argument('--format', choices=('csv', 'jsonl'))
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        report = import_farmers(args.source, args.format, args.chunk_size)
+        print(f"Inserted {report.inserted}, rejected {report.rejected} ({report.duplicates} duplicates)")
+        for line_no, message in report.errors[:50]:
+            print(f"  line {line_no}: {message}", file=sys.stderr)
+        if len(report.errors) > 50:
+            print(f"  ... {len(report.errors) - 50} more", file=sys.stderr)
+    else:
+        count = export_table(args.table, args.dest, args.format)
+        print(f"Exported {count} rows from {args.table}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# backend/connection.py – Pooled SQLite Connections (WAL + Tuned Pragmas)
+import atexit
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from backend.migrations import migrate
+
+DB_PATH = os.getenv('KRISHI_DB_PATH', 'krishi.db')
+
+# Applied once per new connection (journal_mode=WAL is persistent in the file)
+PRAGMAS = (
+    ('journal_mode', 'WAL'),      # Readers don't block the writer
+    ('synchronous', 'NORMAL'),    # Safe with WAL; fsync only at checkpoints
+    ('cache_size', -16000),       # ~16 MB page cache (negative = KiB)
+    ('mmap_size', 134217728),     # 128 MB memory-mapped reads
+    ('busy_timeout', 5000),       # Wait up to 5s for a lock instead of failing
+    ('temp_store', 'MEMORY'),
+)
+
+
+class ConnectionPool:
+    """
+    Reusable SQLite connections for one database file.
+    A thread checks a connection out for the outermost `connection()` block;
+    nested blocks in the same thread share it. Idle connections are kept for
+    the next caller (Streamlit runs each rerun on a fresh thread, so plain
+    thread-locals would leak one connection per rerun).
+    Schema migrations run on the first checkout in this process.
+    """
+
+    def __init__(self, path, max_idle=8):
+        self.path = path
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._migrated = False
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        for name, value in PRAGMAS:
+            conn.execute(f'PRAGMA {name}={value}')
+        return conn
+
+    def _checkout(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._open()
+
+    def _ensure_schema(self, conn):
+        if self._migrated:
+            return
+        with self._lock:
+            if not self._migrated:
+                migrate(conn)
+                self._migrated = True
+
+    def _checkin(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Yield a connection; the outermost block commits on success, rolls back on error."""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held  # Nested: outer block owns the transaction
+            return
+
+        conn = self._checkout()
+        self._local.conn = conn
+        try:
+            self._ensure_schema(conn)
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._checkin(conn)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None):
+    path = path or DB_PATH
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(path, ConnectionPool(path))
+    return pool
+
+
+@contextmanager
+def db_connection(path=None):
+    """Shortcut: `with db_connection() as conn:` on the default database."""
+    with get_pool(path).connection() as conn:
+        yield conn
+
+
+@atexit.register
+def close_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
@@ -1,94 +1,95 @@
 import sqlite3
-import os
 
-DB_PATH = 'krishi.db'
+from backend.connection import DB_PATH, db_connection
+from backend.profile_cache import ProfileCache
+from backend.records import Farmer, farmer_row_factory
+from backend.writer import get_query_writer
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS farmers (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE,
-        name TEXT,
-        age INTEGER,
-        gender TEXT,
-        phone TEXT,
-        fcm_token TEXT,
-        location_ml TEXT,
-        location_en TEXT,
-        lat REAL,
-        lon REAL,
-        crop TEXT,
-        soil TEXT,
-        field_type TEXT,
-        farm_size REAL,
-        irrigation_type TEXT,
-        experience INTEGER,
-        pests_history TEXT,
-        yield_goals TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS queries (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        farmer_id INTEGER,
-        query TEXT,
-        response TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (farmer_id) REFERENCES farmers (id)
-    )''')
-    conn.commit()
-    conn.close()
+    # Schema is migrated once per process on first connection (backend/migrations.py);
+    # calling this at startup just makes that happen eagerly.
+    with db_connection():
+        pass
 
 def save_farmer(data):
-    init_db()  # Ensure table exists
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     try:
-        c.execute('''INSERT INTO farmers (username, name, age, gender, phone, fcm_token, location_ml, location_en, lat, lon, crop, soil, field_type, farm_size, irrigation_type, experience, pests_history, yield_goals)
+        with db_connection() as conn:
+            c = conn.execute('''INSERT INTO farmers (username, name, age, gender, phone, fcm_token, location_ml, location_en, lat, lon, crop, soil, field_type, farm_size, irrigation_type, experience, pests_history, yield_goals)
                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
                   (data['username'], data['name'], data['age'], data['gender'], data['phone'], data.get('fcm_token'), data['location_ml'], data['location_en'], data['lat'], data['lon'], data['crop'], data['soil'], data['field_type'], data['farm_size'], data['irrigation_type'], data['experience'], data['pests_history'], data['yield_goals']))
-        farmer_id = c.lastrowid
-        conn.commit()
-        return type('obj', (object,), {'id': farmer_id})()  # Mock object with id
+            farmer_id = c.lastrowid
+        profile_cache.invalidate(username=data['username'])
+        farmer = Farmer.from_mapping(data)
+        farmer.id = farmer_id
+        return farmer
     except sqlite3.IntegrityError:
         return None  # Username exists
-    finally:
-        conn.close()
 
 def get_farmer_data(username):
-    init_db()
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('SELECT * FROM farmers WHERE username = ?', (username,))
-    row = c.fetchone()
-    conn.close()
-    if row:
-        return type('Farmer', (object,), {
-            'id': row[0], 'username': row[1], 'name': row[2], 'age': row[3], 'gender': row[4],
-            'phone': row[5], 'fcm_token': row[6], 'location_ml': row[7], 'location_en': row[8],
-            'lat': row[9], 'lon': row[10], 'crop': row[11], 'soil': row[12], 'field_type': row[13],
-            'farm_size': row[14], 'irrigation_type': row[15], 'experience': row[16],
-            'pests_history': row[17], 'yield_goals': row[18]
-        })()  # Mock farmer object
-    return None
+    with db_connection() as conn:
+        c = conn.cursor()
+        c.row_factory = farmer_row_factory
+        return c.execute('SELECT * FROM farmers WHERE username = ?', (username,)).fetchone()
+
+def get_farmers(usernames, chunk_size=500):
+    """Bulk lookup: {username: Farmer} for the usernames that exist (one SELECT per chunk)."""
+    usernames = list(dict.fromkeys(usernames))  # De-duplicate, keep order
+    found = {}
+    with db_connection() as conn:
+        c = conn.cursor()
+        c.row_factory = farmer_row_factory
+        for start in range(0, len(usernames), chunk_size):  # Stay under SQLite's bound-parameter limit
+            chunk = usernames[start:start + chunk_size]
+            placeholders = ', '.join('?' * len(chunk))
+            for farmer in c.execute(f'SELECT * FROM farmers WHERE username IN ({placeholders})', chunk):
+                found[farmer.username] = farmer
+    return found
 
 def get_farmer(username):
     return get_farmer_data(username)  # Alias for consistency
 
+profile_cache = ProfileCache(get_farmer_data)
+
+def get_profile(username):
+    # Cached read for pages; falls through to get_farmer_data on a miss
+    return profile_cache.get(username)
+
 def save_query(farmer_id, query, response):
-    init_db()
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('INSERT INTO queries (farmer_id, query, response) VALUES (?, ?, ?)', (farmer_id, query, response))
-    conn.commit()
-    conn.close()
-    return True
+    # Write-behind: queued for the background writer (backend/writer.py), which
+    # commits in batches; the row is visible to readers within ~flush_interval.
+    return get_query_writer().submit(farmer_id, query, response)
+
+def flush_queries():
+    get_query_writer().flush()
+
+def get_query_history(farmer_id, limit=5, cursor=None, exclude_query=None):
+    """
+    Newest-first page of a farmer's past queries (keyset pagination).
+    Returns (rows, next_cursor); pass next_cursor back to load the following page.
+    next_cursor is None when there is nothing older. exclude_query drops rows
+    asking that question (case/space-insensitive) before the LIMIT.
+    """
+    sql = 'SELECT id, query, response, created_at FROM queries WHERE farmer_id = ?'
+    params = [farmer_id]
+    if exclude_query is not None:
+        sql += ' AND lower(trim(query)) != lower(trim(?))'
+        params.append(exclude_query)
+    if cursor is not None:
+        sql += ' AND (created_at, id) < (?, ?)'
+        params.extend(cursor)
+    sql += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+    params.append(limit + 1)  # One extra row tells us whether another page exists
+    with db_connection() as conn:
+        fetched = conn.execute(sql, params).fetchall()
+    rows = [
+        {'id': r[0], 'query': r[1], 'response': r[2], 'created_at': r[3]}
+        for r in fetched[:limit]
+    ]
+    next_cursor = (rows[-1]['created_at'], rows[-1]['id']) if len(fetched) > limit else None
+    return rows, next_cursor
 
 def update_farmer_token(farmer_id, token):
-    init_db()
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('UPDATE farmers SET fcm_token = ? WHERE id = ?', (token, farmer_id))
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        c = conn.execute('UPDATE farmers SET fcm_token = ? WHERE id = ?', (token, farmer_id))
+    profile_cache.invalidate(farmer_id=farmer_id)
     return c.rowcount > 0
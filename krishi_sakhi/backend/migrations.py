@@ -0,0 +1,148 @@
+# backend/migrations.py – Versioned Schema Migrations (Run Once Per Process)
+# Add new steps to the END of MIGRATIONS; never edit or reorder applied ones.
+
+def _create_base_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS farmers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        name TEXT,
+        age INTEGER,
+        gender TEXT,
+        phone TEXT,
+        fcm_token TEXT,
+        location_ml TEXT,
+        location_en TEXT,
+        lat REAL,
+        lon REAL,
+        crop TEXT,
+        soil TEXT,
+        field_type TEXT,
+        farm_size REAL,
+        irrigation_type TEXT,
+        experience INTEGER,
+        pests_history TEXT,
+        yield_goals TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS queries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        farmer_id INTEGER,
+        query TEXT,
+        response TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (farmer_id) REFERENCES farmers (id)
+    )''')
+
+def _reconcile_query_columns(conn):
+    # Databases created from the old SQLAlchemy model (e.g. farmers.db) used
+    # user_input / ai_response / timestamp; rename them to the names the app queries.
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(queries)')}
+    for old, new in (('user_input', 'query'), ('ai_response', 'response'), ('timestamp', 'created_at')):
+        if old in columns and new not in columns:
+            conn.execute(f'ALTER TABLE queries RENAME COLUMN {old} TO {new}')
+
+def _add_lookup_indexes(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_queries_farmer_id ON queries (farmer_id)')
+
+def _index_history_by_time(conn):
+    # (farmer_id, created_at) serves the history page's ORDER BY without a sort;
+    # rowid is implicitly the last key column, so the (created_at, id) cursor is covered too.
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_queries_farmer_created ON queries (farmer_id, created_at)')
+    conn.execute('DROP INDEX IF EXISTS idx_queries_farmer_id')  # Redundant prefix of the new index
+
+def _create_query_search_index(conn):
+    # External-content FTS5 table: stores only the index, text stays in `queries`.
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS queries_fts USING fts5(
+        query, response, content='queries', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS queries_fts_ai AFTER INSERT ON queries BEGIN
+        INSERT INTO queries_fts (rowid, query, response) VALUES (new.id, new.query, new.response);
+    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS queries_fts_ad AFTER DELETE ON queries BEGIN
+        INSERT INTO queries_fts (queries_fts, rowid, query, response) VALUES ('delete', old.id, old.query, old.response);
+    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS queries_fts_au AFTER UPDATE ON queries BEGIN
+        INSERT INTO queries_fts (queries_fts, rowid, query, response) VALUES ('delete', old.id, old.query, old.response);
+        INSERT INTO queries_fts (rowid, query, response) VALUES (new.id, new.query, new.response);
+    END''')
+    conn.execute("INSERT INTO queries_fts (queries_fts) VALUES ('rebuild')")  # Index rows that predate the triggers
+
+def _create_farmer_spatial_index(conn):
+    # R*Tree over farm points (min == max); id matches farmers.id
+    conn.execute('CREATE VIRTUAL TABLE IF NOT EXISTS farmers_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS farmers_rtree_ai AFTER INSERT ON farmers
+        WHEN new.lat IS NOT NULL AND new.lon IS NOT NULL BEGIN
+        INSERT INTO farmers_rtree VALUES (new.id, new.lat, new.lat, new.lon, new.lon);
+    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS farmers_rtree_au AFTER UPDATE OF lat, lon ON farmers BEGIN
+        DELETE FROM farmers_rtree WHERE id = old.id;
+        INSERT INTO farmers_rtree SELECT new.id, new.lat, new.lat, new.lon, new.lon
+            WHERE new.lat IS NOT NULL AND new.lon IS NOT NULL;
+    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS farmers_rtree_ad AFTER DELETE ON farmers BEGIN
+        DELETE FROM farmers_rtree WHERE id = old.id;
+    END''')
+    conn.execute('''INSERT OR REPLACE INTO farmers_rtree
+        SELECT id, lat, lat, lon, lon FROM farmers WHERE lat IS NOT NULL AND lon IS NOT NULL''')
+
+def _create_response_cache(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS response_cache (
+        key TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        query_norm TEXT NOT NULL,
+        response TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_fp ON response_cache (fingerprint, created_at)')
+
+def _create_translation_memory(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS translation_memory (
+        key TEXT PRIMARY KEY,
+        source TEXT NOT NULL,
+        target TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_translation_memory_created ON translation_memory (created_at)')
+
+MIGRATIONS = [
+    (1, 'create farmers and queries tables', _create_base_tables),
+    (2, 'rename legacy queries columns to query/response/created_at', _reconcile_query_columns),
+    (3, 'index queries by farmer_id', _add_lookup_indexes),
+    (4, 'composite (farmer_id, created_at) index for query history', _index_history_by_time),
+    (5, 'FTS5 full-text index over queries', _create_query_search_index),
+    (6, 'R*Tree spatial index over farmer locations', _create_farmer_spatial_index),
+    (7, 'persistent LLM response cache', _create_response_cache),
+    (8, 'sentence-level translation memory', _create_translation_memory),
+]
+
+def current_version(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+def migrate(conn):
+    """
+    Apply pending migrations in order, each in its own write transaction.
+    Returns the list of versions applied (empty when already up to date).
+    """
+    applied = []
+    if current_version(conn) >= MIGRATIONS[-1][0]:
+        return applied
+    for version, description, step in MIGRATIONS:
+        conn.execute('BEGIN IMMEDIATE')  # Serialises with other processes migrating the same file
+        try:
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            step(conn)
+            conn.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)', (version, description))
+            conn.commit()
+            applied.append(version)
+        except BaseException:
+            conn.rollback()
+            raise
+    return applied
@@ -33,7 +33,7 @@ class Query(Base):
  __tablename__ = 'queries'
  id = Column(Integer, primary_key=True)
  farmer_id = Column(Integer, ForeignKey('farmers.id'))
- user_input = Column(Text)
- ai_response = Column(Text)
- timestamp = Column(DateTime, default=datetime.utcnow)
+ query = Column(Text)  # Column names match backend/migrations.py
+ response = Column(Text)
+ created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -0,0 +1,71 @@
+# backend/profile_cache.py – Process-Wide LRU Cache of Farmer Profiles
+import copy
+import os
+import threading
+from collections import OrderedDict
+
+PROFILE_CACHE_SIZE = int(os.getenv('KRISHI_PROFILE_CACHE_SIZE', '1024'))
+
+
+class ProfileCache:
+    """
+    Bounded LRU of Farmer records keyed by username, shared by all sessions.
+    get() hands out copies, so a session editing its profile (st.session_state.user[...] = ...)
+    never leaks into another session. Writers call invalidate() after changing a row.
+    """
+
+    def __init__(self, loader, max_size=PROFILE_CACHE_SIZE):
+        self.loader = loader
+        self.max_size = max_size
+        self._entries = OrderedDict()  # username -> Farmer
+        self._ids = {}                 # farmer id -> username (for invalidation by id)
+        self._lock = threading.Lock()
+        self._generation = 0           # Bumped by invalidate(); stale loads are not stored
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username):
+        with self._lock:
+            farmer = self._entries.get(username)
+            if farmer is not None:
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return copy.copy(farmer)
+            self.misses += 1
+            generation = self._generation
+        farmer = self.loader(username)
+        if farmer is None:
+            return None  # Don't cache misses: the username may be registered next
+        with self._lock:
+            if generation != self._generation:
+                return copy.copy(farmer)  # A write landed while we were loading
+            self._entries[username] = farmer
+            self._entries.move_to_end(username)
+            self._ids[farmer.id] = username
+            while len(self._entries) > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._ids.pop(evicted.id, None)
+        return copy.copy(farmer)
+
+    def invalidate(self, username=None, farmer_id=None):
+        with self._lock:
+            self._generation += 1
+            if username is None and farmer_id is not None:
+                username = self._ids.get(farmer_id)
+            farmer = self._entries.pop(username, None)
+            if farmer is not None:
+                self._ids.pop(farmer.id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._ids.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries), 'max_size': self.max_size,
+                'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
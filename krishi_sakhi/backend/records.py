@@ -0,0 +1,83 @@
+# backend/records.py – Typed Row Records (Attribute + Mapping Access)
+from dataclasses import dataclass, fields
+
+
+@dataclass(slots=True)
+class Farmer:
+    """
+    One row of `farmers`. Pages treat the profile like a dict (user.get('crop'),
+    user['fcm_token'] = ...) while older helpers use attributes (farmer.crop);
+    both work. get() falls back to the default for missing keys and NULL columns.
+    """
+    id: int = None
+    username: str = None
+    name: str = None
+    age: int = None
+    gender: str = None
+    phone: str = None
+    fcm_token: str = None
+    location_ml: str = None
+    location_en: str = None
+    lat: float = None
+    lon: float = None
+    crop: str = None
+    soil: str = None
+    field_type: str = None
+    farm_size: float = None
+    irrigation_type: str = None
+    experience: int = None
+    pests_history: str = None
+    yield_goals: str = None
+    created_at: str = None
+
+    @property
+    def location(self):
+        # Normalized location: pages historically read 'location' (Malayalam/weather)
+        # or 'location_ml' (English); both resolve here.
+        return self.location_en or self.location_ml
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in _READABLE_KEYS else None
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        if key not in _READABLE_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _FARMER_FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in _READABLE_KEYS
+
+    def __len__(self):
+        return len(FARMER_FIELDS)
+
+    def keys(self):
+        return FARMER_FIELDS
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in FARMER_FIELDS}
+
+    @classmethod
+    def from_mapping(cls, data):
+        farmer = cls(**{k: v for k, v in data.items() if k in _FARMER_FIELD_SET})
+        if data.get('location'):  # Session dicts from the Malayalam page carry a single 'location'
+            farmer.location_ml = farmer.location_ml or data['location']
+            farmer.location_en = farmer.location_en or data['location']
+        return farmer
+
+
+FARMER_FIELDS = tuple(f.name for f in fields(Farmer))
+_FARMER_FIELD_SET = frozenset(FARMER_FIELDS)
+_READABLE_KEYS = _FARMER_FIELD_SET | {'location'}
+
+
+def farmer_row_factory(cursor, row):
+    """sqlite3 row_factory: map columns by name (order-independent, extra columns ignored)."""
+    return Farmer(**{
+        col[0]: value for col, value in zip(cursor.description, row) if col[0] in _FARMER_FIELD_SET
+    })
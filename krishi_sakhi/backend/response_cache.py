@@ -0,0 +1,219 @@
+# backend/response_cache.py – Persistent Semantic Cache for AI Advice Responses
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from backend.connection import get_pool
+
+RESPONSE_CACHE_TTL = float(os.getenv('KRISHI_RESPONSE_CACHE_TTL', str(7 * 24 * 3600)))  # Seconds
+RESPONSE_CACHE_SIZE = int(os.getenv('KRISHI_RESPONSE_CACHE_SIZE', '2000'))              # In-memory entries
+RESPONSE_CACHE_MAX_ROWS = int(os.getenv('KRISHI_RESPONSE_CACHE_MAX_ROWS', '50000'))     # Persisted entries
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('KRISHI_NEAR_DUPLICATE_THRESHOLD', '0.85'))
+
+# Words that change phrasing but not the advice asked for
+_FILLER = frozenset(
+    'a an the to for of in on my our your i we is are be do does did what how when which '
+    'should can could please tell me about with and or at this that it'.split()
+)
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+# Words that flip or size the advice while barely moving a trigram score; near hits must match them exactly
+_NEGATIONS = frozenset('not no never nor without avoid cannot dont doesnt didnt shouldnt'.split())
+_NUMBER_WORDS = frozenset('zero one two three four five six seven eight nine ten twenty hundred half quarter double'.split())
+
+
+def normalize_query(text):
+    """Order-insensitive normal form: lowercase content words, de-duplicated and sorted."""
+    words = [w for w in _WORD_RE.findall((text or '').lower()) if w not in _FILLER]
+    return ' '.join(sorted(set(words)))
+
+
+def _field(profile, name):
+    if profile is None:
+        return None
+    return profile.get(name) if hasattr(profile, 'get') else getattr(profile, name, None)
+
+
+def profile_fingerprint(profile, lang_code, scope=None):
+    """Coarse profile bucket: advice is shared only between farmers with the same crop, soil, district and language."""
+    district = _field(profile, 'location') or _field(profile, 'location_en') or _field(profile, 'location_ml')
+    parts = [_field(profile, 'crop'), _field(profile, 'soil'), district, lang_code]
+    fingerprint = '|'.join(str(p or '').strip().lower() for p in parts)
+    return f'{fingerprint}|{scope}' if scope else fingerprint
+
+
+def _vector(text):
+    # Character-trigram counts: a cheap embedding that tolerates typos and word variants
+    padded = f'  {text} '
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _guard(query_norm):
+    """Quantities and negations in a normalized query; "don't" splits into don + t, so a lone t counts as not."""
+    words = query_norm.split()
+    numbers = frozenset(w for w in words if w in _NUMBER_WORDS or any(c.isdigit() for c in w))
+    negated = any(w in _NEGATIONS or w == 't' for w in words)
+    return numbers, negated
+
+
+def _cosine(a, b):
+    dot = sum(v * b.get(k, 0) for k, v in a.items())
+    if not dot:
+        return 0.0
+    return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())))
+
+
+class ResponseCache:
+    """
+    Exact + near-duplicate cache of final advice text.
+    Key = (normalized query, profile fingerprint). Lookups hit an in-memory LRU;
+    misses on a fingerprint load its persisted rows from SQLite once, so hits
+    survive restarts. Entries older than `ttl` seconds are treated as misses.
+    """
+
+    def __init__(self, path=None, ttl=RESPONSE_CACHE_TTL, max_size=RESPONSE_CACHE_SIZE,
+                 max_rows=RESPONSE_CACHE_MAX_ROWS, threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_rows = max_rows
+        self.threshold = threshold
+        self._entries = OrderedDict()   # key -> (fingerprint, query_norm, response, created_at)
+        self._by_fingerprint = {}       # fingerprint -> {key: trigram vector}
+        self._loaded = set()            # fingerprints already read from SQLite
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.counts = Counter()
+
+    @staticmethod
+    def _key(fingerprint, query_norm):
+        return hashlib.sha1(f'{fingerprint}\x1f{query_norm}'.encode('utf-8')).hexdigest()
+
+    def _remember(self, key, fingerprint, query_norm, response, created_at):
+        # Caller holds the lock
+        self._entries[key] = (fingerprint, query_norm, response, created_at)
+        self._entries.move_to_end(key)
+        self._by_fingerprint.setdefault(fingerprint, {})[key] = _vector(query_norm)
+        while len(self._entries) > self.max_size:
+            old_key, (old_fp, *_rest) = self._entries.popitem(last=False)
+            self._by_fingerprint.get(old_fp, {}).pop(old_key, None)
+
+    def _forget(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._by_fingerprint.get(entry[0], {}).pop(key, None)
+
+    def _load_fingerprint(self, fingerprint):
+        if fingerprint in self._loaded:
+            return
+        cutoff = time.time() - self.ttl
+        with get_pool(self.path).connection() as conn:
+            rows = conn.execute(
+                'SELECT key, query_norm, response, created_at FROM response_cache '
+                'WHERE fingerprint = ? AND created_at >= ? ORDER BY created_at DESC LIMIT ?',
+                (fingerprint, cutoff, self.max_size),
+            ).fetchall()
+        with self._lock:
+            for key, query_norm, response, created_at in reversed(rows):
+                if key not in self._entries:
+                    self._remember(key, fingerprint, query_norm, response, created_at)
+            self._loaded.add(fingerprint)
+
+    def _load_key(self, key):
+        with get_pool(self.path).connection() as conn:
+            row = conn.execute(
+                'SELECT fingerprint, query_norm, response, created_at FROM response_cache WHERE key = ?', (key,)
+            ).fetchone()
+        if row:
+            with self._lock:
+                self._remember(key, *row)
+
+    def get(self, query, profile, lang_code, scope=None):
+        """
+        Cached response text or None. Counts exact hits, near hits and misses.
+        `scope` narrows sharing further (e.g. a digest of the farmer's history
+        when it shaped the answer); entries are only matched within one scope.
+        """
+        query_norm = normalize_query(query)
+        if not query_norm:
+            return None
+        fingerprint = profile_fingerprint(profile, lang_code, scope)
+        key = self._key(fingerprint, query_norm)
+        self._load_fingerprint(fingerprint)
+        if key not in self._entries:
+            self._load_key(key)  # May have been evicted from memory but still persisted
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[3] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.counts['exact_hits'] += 1
+                return entry[2]
+            if entry:
+                self._forget(key)
+
+            vector, guard = _vector(query_norm), _guard(query_norm)
+            best_key, best_score = None, self.threshold
+            for other_key, other_vector in self._by_fingerprint.get(fingerprint, {}).items():
+                score = _cosine(vector, other_vector)
+                if score >= best_score and _guard(self._entries[other_key][1]) == guard:
+                    best_key, best_score = other_key, score
+            if best_key is not None and now - self._entries[best_key][3] <= self.ttl:
+                self._entries.move_to_end(best_key)
+                self.counts['near_hits'] += 1
+                return self._entries[best_key][2]
+            self.counts['misses'] += 1
+            return None
+
+    def put(self, query, profile, lang_code, response, scope=None):
+        query_norm = normalize_query(query)
+        if not query_norm or not response:
+            return
+        fingerprint = profile_fingerprint(profile, lang_code, scope)
+        key = self._key(fingerprint, query_norm)
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, fingerprint, query_norm, response, created_at)
+            self._puts += 1
+            prune = self._puts % 100 == 0
+        with get_pool(self.path).connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO response_cache (key, fingerprint, query_norm, response, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, fingerprint, query_norm, response, created_at),
+            )
+            if prune:  # Every 100 writes: drop expired rows and cap the table size
+                conn.execute('DELETE FROM response_cache WHERE created_at < ?', (created_at - self.ttl,))
+                conn.execute(
+                    'DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache '
+                    'ORDER BY created_at DESC LIMIT -1 OFFSET ?)', (self.max_rows,)
+                )
+
+    def stats(self):
+        with self._lock:
+            hits = self.counts['exact_hits'] + self.counts['near_hits']
+            total = hits + self.counts['misses']
+            return {
+                'size': len(self._entries),
+                'exact_hits': self.counts['exact_hits'],
+                'near_hits': self.counts['near_hits'],
+                'misses': self.counts['misses'],
+                'hit_rate': hits / total if total else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,78 @@
+# backend/search.py – Full-Text Search Over Past Questions & Answers (FTS5 + BM25)
+import re
+
+from backend.connection import db_connection
+
+# bm25() column weights for (query, response): a match in the question counts double
+QUESTION_WEIGHT = 2.0
+ANSWER_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def match_expression(text, column=None):
+    """
+    Turn free text into a safe FTS5 MATCH string: every word is quoted (so
+    operators/punctuation in user input can't break the query) and OR-ed, letting
+    BM25 rank documents that share more (and rarer) words higher.
+    """
+    terms = ' OR '.join(f'"{tok}"' for tok in dict.fromkeys(_tokens(text)))
+    if not terms:
+        return None
+    return f'{column} : ({terms})' if column else terms
+
+
+def search_queries(text, limit=5, farmer_id=None, questions_only=False, exclude_query=None):
+    """
+    Top-`limit` past exchanges for `text`, best first. Each hit is a dict with
+    id, farmer_id, query, response, created_at and score (higher = better).
+    exclude_query drops exchanges asking that exact question before the LIMIT.
+    """
+    expression = match_expression(text, 'query' if questions_only else None)
+    if expression is None:
+        return []
+    sql = f'''SELECT q.id, q.farmer_id, q.query, q.response, q.created_at,
+                     bm25(queries_fts, {QUESTION_WEIGHT}, {ANSWER_WEIGHT}) AS rank
+              FROM queries_fts JOIN queries q ON q.id = queries_fts.rowid
+              WHERE queries_fts MATCH ?'''
+    params = [expression]
+    if farmer_id is not None:
+        sql += ' AND q.farmer_id = ?'
+        params.append(farmer_id)
+    if exclude_query is not None:
+        sql += ' AND lower(trim(q.query)) != lower(trim(?))'
+        params.append(exclude_query)
+    sql += ' ORDER BY rank LIMIT ?'
+    params.append(limit)
+    with db_connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [
+        {'id': r[0], 'farmer_id': r[1], 'query': r[2], 'response': r[3], 'created_at': r[4], 'score': -r[5]}
+        for r in rows
+    ]
+
+
+def find_similar_question(text, min_overlap=0.8, candidates=5):
+    """
+    Best past exchange whose question is a near-duplicate of `text` (word-set
+    Jaccard overlap >= min_overlap), or None. Cheap enough to run before an LLM call.
+    """
+    words = set(_tokens(text))
+    if not words:
+        return None
+    best, best_overlap = None, 0.0
+    for hit in search_queries(text, limit=candidates, questions_only=True):
+        if not hit['response']:
+            continue
+        other = set(_tokens(hit['query']))
+        overlap = len(words & other) / len(words | other)
+        if overlap > best_overlap:
+            best, best_overlap = hit, overlap
+    if best is None or best_overlap < min_overlap:
+        return None
+    best['overlap'] = best_overlap
+    return best
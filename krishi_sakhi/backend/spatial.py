@@ -0,0 +1,62 @@
+# backend/spatial.py – Region-Scoped Farmer Lookups (R*Tree Bounding Box + Haversine)
+import math
+
+from backend.connection import db_connection
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+# R*Tree stores 32-bit floats; pad boxes so rounding never drops an edge point
+_RTREE_PAD_DEG = 1e-4
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bounding_box(lat, lon, radius_km):
+    """(min_lat, max_lat, min_lon, max_lon) enclosing the circle."""
+    dlat = radius_km / KM_PER_DEG_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = min(radius_km / (KM_PER_DEG_LAT * cos_lat), 180.0)
+    return (max(lat - dlat, -90.0), min(lat + dlat, 90.0), lon - dlon, lon + dlon)
+
+
+def farmers_in_bbox(min_lat, max_lat, min_lon, max_lon, with_token_only=False):
+    """
+    All farmers whose farm point lies in the box, as dicts with
+    id, username, fcm_token, lat and lon. One indexed statement.
+    """
+    sql = '''SELECT f.id, f.username, f.fcm_token, f.lat, f.lon
+             FROM farmers_rtree r JOIN farmers f ON f.id = r.id
+             WHERE r.min_lat <= ? AND r.max_lat >= ? AND r.min_lon <= ? AND r.max_lon >= ?'''
+    if with_token_only:
+        sql += " AND f.fcm_token IS NOT NULL AND f.fcm_token != ''"
+    params = (max_lat + _RTREE_PAD_DEG, min_lat - _RTREE_PAD_DEG, max_lon + _RTREE_PAD_DEG, min_lon - _RTREE_PAD_DEG)
+    with db_connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [
+        {'id': r[0], 'username': r[1], 'fcm_token': r[2], 'lat': r[3], 'lon': r[4]}
+        for r in rows
+        if min_lat <= r[3] <= max_lat and min_lon <= r[4] <= max_lon
+    ]
+
+
+def farmers_within_radius(lat, lon, radius_km, with_token_only=False):
+    """Farmers within radius_km of (lat, lon), nearest first, each with distance_km."""
+    hits = []
+    for farmer in farmers_in_bbox(*bounding_box(lat, lon, radius_km), with_token_only=with_token_only):
+        distance = haversine_km(lat, lon, farmer['lat'], farmer['lon'])
+        if distance <= radius_km:
+            farmer['distance_km'] = distance
+            hits.append(farmer)
+    hits.sort(key=lambda f: f['distance_km'])
+    return hits
+
+
+def fcm_tokens_within_radius(lat, lon, radius_km):
+    """Push tokens for a weather-alert fan-out around one grid cell."""
+    return [f['fcm_token'] for f in farmers_within_radius(lat, lon, radius_km, with_token_only=True)]
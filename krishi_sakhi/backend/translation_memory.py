@@ -0,0 +1,147 @@
+# backend/translation_memory.py – Persistent Sentence-Level Translation Memory (LRU over SQLite)
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from backend.connection import get_pool
+
+TM_SIZE = int(os.getenv('KRISHI_TM_SIZE', '5000'))            # Sentences kept in memory
+TM_MAX_ROWS = int(os.getenv('KRISHI_TM_MAX_ROWS', '200000'))  # Sentences persisted
+TM_COUNT_TTL = float(os.getenv('KRISHI_TM_COUNT_TTL', '300'))  # Seconds before the stored count is re-read
+
+_QUOTES = str.maketrans({'‘': "'", '’': "'", '“': '"', '”': '"', '–': '-', '—': '-'})
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sentence(text):
+    """Lookup form: straight quotes, single spaces, casefolded (Malayalam output has no case)."""
+    return _SPACE_RE.sub(' ', (text or '').translate(_QUOTES)).strip().casefold()
+
+
+class TranslationMemory:
+    """
+    Source sentence → translation, per model. Lookups go to an in-memory LRU,
+    then to SQLite in one query for all the LRU misses, so sentences translated
+    before a restart (or by another process) are still reused.
+    """
+
+    def __init__(self, model, path=None, max_size=TM_SIZE, max_rows=TM_MAX_ROWS):
+        self.model = model
+        self.path = path
+        self.max_size = max_size
+        self.max_rows = max_rows
+        self._entries = OrderedDict()  # key -> translation
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._stored = None  # Rows in SQLite, kept current by put_many; None until first counted
+        self._stored_at = 0.0
+        self.counts = Counter()
+
+    def _key(self, sentence):
+        return hashlib.sha1(f'{self.model}\x1f{normalize_sentence(sentence)}'.encode('utf-8')).hexdigest()
+
+    def _remember(self, key, target):
+        # Caller holds the lock
+        self._entries[key] = target
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_many(self, sentences):
+        """{sentence: translation} for every sentence already in memory; the rest are misses."""
+        keys = {sentence: self._key(sentence) for sentence in sentences}
+        found, missing = {}, {}
+        with self._lock:
+            for sentence, key in keys.items():
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[sentence] = self._entries[key]
+                else:
+                    missing.setdefault(key, []).append(sentence)
+            self.counts['memory_hits'] += len(found)
+        if missing:
+            placeholders = ','.join('?' * len(missing))
+            with get_pool(self.path).connection() as conn:
+                rows = conn.execute(
+                    f'SELECT key, target FROM translation_memory WHERE key IN ({placeholders})', list(missing)
+                ).fetchall()
+            with self._lock:
+                for key, target in rows:
+                    self._remember(key, target)
+                    for sentence in missing.pop(key):
+                        found[sentence] = target
+                self.counts['store_hits'] += len(rows)
+                self.counts['misses'] += sum(len(s) for s in missing.values())
+        return found
+
+    def put_many(self, pairs):
+        """Store (source sentence, translation) pairs."""
+        now = time.time()
+        rows = [(self._key(source), source, target, now) for source, target in pairs if source and target]
+        if not rows:
+            return
+        with self._lock:
+            for key, _source, target, _ in rows:
+                self._remember(key, target)
+            self._puts += len(rows)
+            prune = self._puts >= 500
+            if prune:
+                self._puts = 0
+        keys = list({key for key, *_ in rows})
+        with get_pool(self.path).connection() as conn:
+            # Replaced rows don't add to the count, so look up which keys are already stored
+            existing = conn.execute(
+                f'SELECT COUNT(*) FROM translation_memory WHERE key IN ({",".join("?" * len(keys))})', keys
+            ).fetchone()[0]
+            conn.executemany(
+                'INSERT OR REPLACE INTO translation_memory (key, source, target, created_at) VALUES (?, ?, ?, ?)', rows
+            )
+            deleted = 0
+            if prune:  # Keep the newest max_rows sentences
+                deleted = conn.execute(
+                    'DELETE FROM translation_memory WHERE key IN (SELECT key FROM translation_memory '
+                    'ORDER BY created_at DESC LIMIT -1 OFFSET ?)', (self.max_rows,)
+                ).rowcount
+        with self._lock:
+            if self._stored is not None:
+                self._stored += len(keys) - existing - deleted
+
+    def _stored_count(self):
+        """Rows in SQLite. Counted once, then kept by put_many; re-read after TM_COUNT_TTL for other processes' writes."""
+        with self._lock:
+            if self._stored is not None and time.monotonic() - self._stored_at < TM_COUNT_TTL:
+                return self._stored
+        with get_pool(self.path).connection() as conn:
+            stored = conn.execute('SELECT COUNT(*) FROM translation_memory').fetchone()[0]
+        with self._lock:
+            self._stored, self._stored_at = stored, time.monotonic()
+        return stored
+
+    def stats(self):
+        stored = self._stored_count()
+        with self._lock:
+            hits = self.counts['memory_hits'] + self.counts['store_hits']
+            total = hits + self.counts['misses']
+            return {
+                'size': len(self._entries),
+                'stored': stored,
+                'memory_hits': self.counts['memory_hits'],
+                'store_hits': self.counts['store_hits'],
+                'misses': self.counts['misses'],
+                'hit_rate': hits / total if total else 0.0,
+            }
+
+
+_memories = {}
+_memories_lock = threading.Lock()
+
+
+def get_translation_memory(model):
+    memory = _memories.get(model)
+    if memory is None:
+        with _memories_lock:
+            memory = _memories.setdefault(model, TranslationMemory(model))
+    return memory
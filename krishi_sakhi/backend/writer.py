@@ -0,0 +1,128 @@
+# backend/writer.py – Write-Behind Queue for Query Logging (Batched Commits)
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from backend.connection import get_pool
+
+logger = logging.getLogger(__name__)
+
+INSERT_QUERY = 'INSERT INTO queries (farmer_id, query, response) VALUES (?, ?, ?)'
+
+_STOP = object()
+
+
+class QueryWriter:
+    """
+    Background thread that drains queued (farmer_id, query, response) rows and
+    inserts them with executemany, one commit per batch. A batch is written when
+    it reaches batch_size rows or flush_interval seconds after its first row.
+
+    Backpressure: the queue is bounded. submit() blocks for up to put_timeout
+    when it is full, then writes the row synchronously so nothing is dropped.
+    """
+
+    def __init__(self, path=None, batch_size=50, flush_interval=0.5, max_queue=1000, put_timeout=0.25):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {'enqueued': 0, 'written': 0, 'batches': 0, 'sync_writes': 0, 'failed': 0}
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='krishi-query-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, farmer_id, query, response):
+        row = (farmer_id, query, response)
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+            self.stats['enqueued'] += 1
+        except queue.Full:
+            self.stats['sync_writes'] += 1
+            self._write([row])
+        return True
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until every row submitted so far is committed."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Flush remaining rows and stop the writer thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _write(self, rows):
+        with get_pool(self.path).connection() as conn:
+            conn.executemany(INSERT_QUERY, rows)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                self._write(batch)
+                self.stats['written'] += len(batch)
+                self.stats['batches'] += 1
+            except Exception:
+                self.stats['failed'] += len(batch)
+                logger.exception('Query log batch of %d rows failed', len(batch))
+            finally:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self._queue.task_done()
+            if stop:
+                return
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_query_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = QueryWriter()
+    return _writer
+
+
+@atexit.register
+def _flush_on_shutdown():
+    if _writer is not None:
+        _writer.close()
@@ -0,0 +1,84 @@
+# benchmarks/cold_start.py – Cold-Start Import Time per Page (Fresh Interpreter per Run)
+# Run from krishi_sakhi/:  python -m benchmarks.cold_start [--repeat 5] [--top 5]
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ['app.py', 'pages/1_english.py', 'pages/2_malayalam.py', 'pages/3_weather_en.py', 'pages/4_weather_ml.py']
+
+
+def page_imports(path):
+    """The page's module-level import statements (including those in top-level try blocks), as source."""
+    with open(path, encoding='utf-8') as src:
+        source = src.read()
+    statements = []
+    for node in ast.parse(source).body:
+        nodes = node.body if isinstance(node, ast.Try) else [node]
+        statements += [ast.get_source_segment(source, n) for n in nodes if isinstance(n, (ast.Import, ast.ImportFrom))]
+    return statements
+
+
+def _script(statements):
+    # Each import guarded like the pages guard optional modules, so one missing package doesn't stop the run
+    body = '\n'.join(f"try:\n    {s}\nexcept ImportError:\n    pass" for s in statements)
+    return f"import time\n_t = time.perf_counter()\n{body}\nprint(time.perf_counter() - _t)\n"
+
+
+def _top_level(importtime):
+    """{module: cumulative seconds} for modules the script imported directly (from -X importtime output)."""
+    costs = {}
+    for line in importtime.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part for part in line.split(':', 1)[1].split('|'))
+        if name[1:2] != ' ':  # Nested imports are indented one extra space per level
+            costs[name.strip()] = int(cumulative) / 1e6
+    return costs
+
+
+def _run(script):
+    env = dict(os.environ, KRISHI_WARMUP='0', PYTHONDONTWRITEBYTECODE='1')
+    run = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], cwd=ROOT, env=env,
+                         capture_output=True, text=True)
+    if run.returncode != 0:
+        raise RuntimeError(run.stderr.strip().splitlines()[-1] if run.stderr.strip() else 'failed')
+    return run
+
+
+def measure(page, repeat):
+    script = _script(page_imports(os.path.join(ROOT, page)))
+    startup = set(_top_level(_run(_script([])).stderr))  # Interpreter start-up, paid by every process
+    totals, modules = [], {}
+    for _ in range(repeat):
+        run = _run(script)
+        totals.append(float(run.stdout.strip().splitlines()[-1]))
+        for name, seconds in _top_level(run.stderr).items():
+            if name not in startup:
+                modules.setdefault(name, []).append(seconds)
+    return statistics.median(totals), {name: statistics.median(values) for name, values in modules.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('pages', nargs='*', default=PAGES)
+    args = parser.parse_args(argv)
+
+    for page in args.pages:
+        try:
+            total, modules = measure(page, args.repeat)
+        except Exception as e:
+            print(f"{page:<24} failed: {e}")
+            continue
+        slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        print(f"{page:<24} {total:>6.2f}s  " + ', '.join(f"{name} {seconds:.2f}s" for name, seconds in slowest))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# benchmarks/translation_length.py – Translation Throughput vs. Answer Length (Whole Input vs. Segmented Chunks)
+# Run from krishi_sakhi/:  python -m benchmarks.translation_length [--steps 2 5 10 20 40] [--repeat 3]
+import argparse
+import sys
+import time
+
+from utils.segmenter import CHUNK_TOKENS, reassemble, segment_text
+from utils.translation import TRANSLATION_MODEL
+
+STEPS = [
+    "Apply neem oil spray (5 ml per litre of water) in the evening to control sucking pests.",
+    "Ensure proper drainage in the field, because standing water causes root rot during the monsoon.",
+    "Mulch the base of each plant with dry leaves to keep the soil moist in summer.",
+    "Apply well-decomposed farmyard manure at 10 kg per plant before the first rains.",
+    "Remove and destroy badly affected leaves so the disease does not spread to healthy plants.",
+    "Spray 1% Bordeaux mixture on the leaves and stems after the first monsoon showers.",
+    "Test your soil at the nearest Krishi Bhavan and apply lime if the pH is below 5.5.",
+    "Irrigate every three to four days in summer, preferably early in the morning.",
+]
+
+
+def make_answer(steps):
+    """A numbered LLM-style answer: intro paragraph, `steps` steps, closing line."""
+    lines = ["Here is what you can do for your crop this season:", ""]
+    lines += [f"{i}. {STEPS[(i - 1) % len(STEPS)]}" for i in range(1, steps + 1)]
+    lines += ["", "Consult your local Krishi Bhavan if the problem continues."]
+    return '\n'.join(lines)
+
+
+def translate_whole(pipe, text, max_length):
+    return pipe([text], max_length=max_length)[0]['translation_text']
+
+
+def translate_segmented(pipe, text, max_length):
+    segments = segment_text(text, CHUNK_TOKENS, lambda s: len(pipe.tokenizer.encode(s, add_special_tokens=False)))
+    results = pipe([s.text for s in segments], max_length=max_length, batch_size=len(segments))
+    return reassemble(segments, [r['translation_text'] for r in results])
+
+
+def timed(fn, repeat):
+    best, output = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--steps', type=int, nargs='+', default=[2, 5, 10, 20, 40])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-length', type=int, default=400)
+    args = parser.parse_args(argv)
+
+    try:
+        from transformers import pipeline
+    except ImportError:
+        print("transformers is not installed; install requirements.txt to run this benchmark.")
+        return 1
+    pipe = pipeline("translation", model=TRANSLATION_MODEL, device=-1)
+    pipe(["Warm-up."])
+
+    print(f"{'steps':>5} {'tokens':>7} | {'whole s':>8} {'tok/s':>7} {'out':>5} | {'chunked s':>9} {'tok/s':>7} {'out':>5} {'chunks':>6}")
+    for steps in args.steps:
+        text = make_answer(steps)
+        tokens = len(pipe.tokenizer.encode(text))
+        whole_s, whole = timed(lambda: translate_whole(pipe, text, args.max_length), args.repeat)
+        chunked_s, chunked = timed(lambda: translate_segmented(pipe, text, args.max_length), args.repeat)
+        chunks = len(segment_text(text, CHUNK_TOKENS, lambda s: len(pipe.tokenizer.encode(s, add_special_tokens=False))))
+        # Output length in tokens: the whole-input run stops at max_length, so long answers lose their tail
+        print(f"{steps:>5} {tokens:>7} | {whole_s:>8.2f} {tokens / whole_s:>7.0f} {len(pipe.tokenizer.encode(whole)):>5} | "
+              f"{chunked_s:>9.2f} {tokens / chunked_s:>7.0f} {len(pipe.tokenizer.encode(chunked)):>5} {chunks:>6}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
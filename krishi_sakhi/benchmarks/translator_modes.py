@@ -0,0 +1,106 @@
+# benchmarks/translator_modes.py – opus-mt CPU Modes (fp32 / int8 / onnx): Accuracy vs. Latency
+# Run from krishi_sakhi/:  python -m benchmarks.translator_modes [--modes fp32 int8 onnx] [--repeat 3]
+import argparse
+import sys
+import time
+from collections import Counter
+
+from utils.translation import build_translator
+
+# Fixed en → ml sample (advice-style sentences with reference translations); keep it stable across runs
+SAMPLE = [
+    ("Water the plants in the morning.", "രാവിലെ ചെടികൾക്ക് വെള്ളം ഒഴിക്കുക."),
+    ("Apply neem oil spray in the evening.", "വൈകുന്നേരം വേപ്പെണ്ണ തളിക്കുക."),
+    ("Remove the affected leaves and burn them.", "രോഗം ബാധിച്ച ഇലകൾ നീക്കം ചെയ്ത് കത്തിക്കുക."),
+    ("Ensure proper drainage in the field.", "വയലിൽ ശരിയായ നീർവാർച്ച ഉറപ്പാക്കുക."),
+    ("Apply lime to acidic soil before planting.", "നടുന്നതിന് മുമ്പ് അമ്ലഗുണമുള്ള മണ്ണിൽ കുമ്മായം ചേർക്കുക."),
+    ("Heavy rain is expected tomorrow.", "നാളെ കനത്ത മഴ പ്രതീക്ഷിക്കുന്നു."),
+    ("Do not spray pesticides before rain.", "മഴയ്ക്ക് മുമ്പ് കീടനാശിനി തളിക്കരുത്."),
+    ("Contact your local Krishi Bhavan for help.", "സഹായത്തിന് നിങ്ങളുടെ അടുത്തുള്ള കൃഷിഭവനുമായി ബന്ധപ്പെടുക."),
+    ("Mulch the base of the coconut palm with dry leaves.", "തെങ്ങിന്റെ ചുവട്ടിൽ ഉണങ്ങിയ ഇലകൾ കൊണ്ട് പുതയിടുക."),
+    ("Use organic manure to improve soil health.", "മണ്ണിന്റെ ആരോഗ്യം മെച്ചപ്പെടുത്താൻ ജൈവവളം ഉപയോഗിക്കുക."),
+    ("Banana plants need support during strong winds.", "ശക്തമായ കാറ്റിൽ വാഴകൾക്ക് താങ്ങ് നൽകണം."),
+    ("Harvest the paddy when most grains turn golden.", "മിക്ക നെൽമണികളും സ്വർണ്ണനിറമാകുമ്പോൾ കൊയ്യുക."),
+]
+
+
+def _ngrams(text, n):
+    text = ''.join(text.split())  # chrF ignores whitespace
+    return Counter(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def chrf(hypothesis, reference, max_n=6, beta=2.0):
+    """Character n-gram F-score (chrF, 0–100): averaged n-gram precision/recall, recall weighted by beta."""
+    precisions, recalls = [], []
+    for n in range(1, max_n + 1):
+        hyp, ref = _ngrams(hypothesis, n), _ngrams(reference, n)
+        if not hyp or not ref:
+            continue
+        overlap = sum((hyp & ref).values())
+        precisions.append(overlap / sum(hyp.values()))
+        recalls.append(overlap / sum(ref.values()))
+    if not precisions:
+        return 0.0
+    p, r = sum(precisions) / len(precisions), sum(recalls) / len(recalls)
+    if p + r == 0:
+        return 0.0
+    return 100 * (1 + beta ** 2) * p * r / (beta ** 2 * p + r)
+
+
+def run_mode(mode, repeat):
+    started = time.perf_counter()
+    pipe = build_translator(mode, device=-1)
+    load_s = time.perf_counter() - started
+    sources = [en for en, _ in SAMPLE]
+    pipe(sources[:1])  # Warm-up
+
+    single_ms = []
+    for source in sources:
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            pipe([source])
+            best = min(best, time.perf_counter() - started)
+        single_ms.append(best * 1000)
+    started = time.perf_counter()
+    outputs = [r['translation_text'] for r in pipe(sources, batch_size=len(sources))]
+    batch_s = time.perf_counter() - started
+    single_ms.sort()
+    return {
+        'load_s': load_s,
+        'p50_ms': single_ms[len(single_ms) // 2],
+        'p95_ms': single_ms[min(len(single_ms) - 1, int(0.95 * len(single_ms)))],
+        'batch_sent_s': len(sources) / batch_s,
+        'outputs': outputs,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modes', nargs='+', default=['fp32', 'int8', 'onnx'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for mode in args.modes:
+        try:
+            results[mode] = run_mode(mode, args.repeat)
+        except Exception as e:
+            print(f"{mode}: skipped ({e})")
+    if not results:
+        return 1
+
+    baseline = results.get('fp32')
+    print(f"{'mode':<6} {'load s':>7} {'p50 ms':>7} {'p95 ms':>7} {'sent/s':>7} {'chrF':>6} {'vs fp32':>8}")
+    for mode, r in results.items():
+        ref_score = sum(chrf(out, ref) for out, (_, ref) in zip(r['outputs'], SAMPLE)) / len(SAMPLE)
+        # Agreement with fp32 output isolates what the optimization changed from opus-mt's own errors
+        agreement = (sum(chrf(out, base) for out, base in zip(r['outputs'], baseline['outputs'])) / len(SAMPLE)
+                     if baseline else float('nan'))
+        print(f"{mode:<6} {r['load_s']:>7.1f} {r['p50_ms']:>7.0f} {r['p95_ms']:>7.0f} {r['batch_sent_s']:>7.1f} "
+              f"{ref_score:>6.1f} {agreement:>8.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
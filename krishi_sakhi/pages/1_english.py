@@ -1,41 +1,42 @@
 import streamlit as st
-import sqlite3  # For DB queries in history
-import pandas as pd  # For history table (optional; install: pip install pandas)
 import re  # For HTML stripping in msg (safe)
-import speech_recognition as sr  # For transcription
 import io  # For audio handling
-    
-try:
-    import folium
-    from streamlit_folium import st_folium
-    FOLIUM_AVAILABLE = True
-except ImportError:
-    FOLIUM_AVAILABLE = False
-    folium = None
-    st_folium = None
+
+from utils.lazy import lazy_import, module_available
+from utils.warmup import start_warmup
+
+# Heavy modules load on first use, not on every page view
+sr = lazy_import('speech_recognition')  # For transcription
+folium = lazy_import('folium')
+streamlit_folium = lazy_import('streamlit_folium')
+FOLIUM_AVAILABLE = module_available('folium') and module_available('streamlit_folium')
 
 MAP_AVAILABLE = FOLIUM_AVAILABLE  # For map section
 
 from dotenv import load_dotenv
 import os
-from huggingface_hub import InferenceClient
 import requests
 from datetime import datetime
 
 # Custom modules (with fallback warnings)
 try:
-    from backend.database import save_farmer, get_farmer_data, save_query, get_farmer, update_farmer_token, init_db
+    from backend.database import save_farmer, get_farmer_data, save_query, get_farmer, update_farmer_token, init_db, get_query_history, get_profile
     DB_AVAILABLE = True
 except ImportError:
     DB_AVAILABLE = False
     st.error("Create 'backend/database.py' for login/DB features. Using mock mode.")
 
 try:
-    from utils.llm import generate_ai_response
+    from utils.advice import generate_ai_response  # One engine for every page (backend via KRISHI_ADVICE_BACKEND)
+    from utils.singleflight import flight_stats
+    from utils.batch_translator import batch_stats
+    from utils.model_registry import get_registry
+    from utils.scheduler import get_scheduler
+    from utils.translation import memory_stats
     AI_AVAILABLE = True
 except ImportError:
     AI_AVAILABLE = False
-    st.warning("Create 'utils/llm.py' for AI advice. Using sample responses.")
+    st.warning("Create 'utils/advice.py' for AI advice. Using sample responses.")
 
 try:
     from utils.voice import init_voice, speak_browser, listen_browser
@@ -44,6 +45,15 @@ except ImportError:
     VOICE_AVAILABLE = False
     st.warning("Create 'utils/voice.py' for voice features. Using text-only.")
 
+from utils.profile import current_profile  # Normalized profile shared by all pages
+from utils.resilience import CircuitOpenError, get_endpoint  # Timeouts, retries, breaker for upstream calls
+
+try:
+    from backend.response_cache import get_response_cache  # Persistent exact/near-duplicate advice cache
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
+
 # FCM Import (Safe – Set Flag on Success)
 FCM_AVAILABLE = False
 try:
@@ -58,87 +68,6 @@ except ImportError:
 
 load_dotenv()
 
-@st.cache_resource
-def get_hf_client():
-    api_key = os.getenv("HF_TOKEN") or os.getenv("HUGGINGFACE_API_KEY")
-    if not api_key:
-        st.error("HF_TOKEN missing in .env. AI unavailable.")
-        return None
-    return InferenceClient(provider="hf-inference", api_key=api_key)
-
-def generate_ai_response(query, farmer_data, lang_code="en"):
-    client = get_hf_client()  # From prior code (InferenceClient)
-    if not client:
-        return "AI unavailable. Add HF_TOKEN to .env."
-
-    # Use .get() assuming farmer_data is dict
-    profile_str = f"Crop: {farmer_data.get('crop', 'general')}, Location: {farmer_data.get('location_ml', 'your area')}, Soil: {farmer_data.get('soil', 'loamy')}, Farm size: {farmer_data.get('farm_size', 2)} acres."
-
-    # System prompt (English base; adjust for lang if needed)
-    system_content = "You are Krishi Sakhi, a helpful farming expert for Indian farmers in regions like Kerala. Provide simple, actionable advice in English. Focus on sustainable, practical steps. Structure response with numbered steps if possible."
-
-    messages = [
-        {"role": "system", "content": system_content},
-        {"role": "user", "content": f"Query: {query}. Farmer profile: {profile_str}. Advise based on Indian agriculture context."}
-    ]
-
-    try:
-        with st.spinner("Generating AI farming advice..."):
-            completion = client.chat.completions.create(
-                model="HuggingFaceTB/SmolLM3-3B",
-                messages=messages,
-                max_tokens=200,
-                temperature=0.3,
-                top_p=0.9
-            )
-            english_response = completion.choices[0].message.content.strip()
-
-        # Translate if Malayalam selected
-        if lang_code == "ml":
-            with st.spinner("Translating to Malayalam (Local)..."):
-                response = translate_local(english_response, "en", "ml")
-
-            try:
-                with st.spinner("Translating to Malayalam..."):
-                    # Method 1: API POST (Requires upgraded client)
-                    translation_result = client.post(
-                        model="Helsinki-NLP/opus-mt-en-ml",
-                        json={"inputs": english_response}  # Simple payload for seq2seq
-                    )
-                    if isinstance(translation_result, list) and len(translation_result) > 0:
-                        response = translation_result[0].get('translation_text', english_response)
-                    else:
-                        raise ValueError("Invalid translation response")
-            except AttributeError as attr_e:
-                # Fallback if no 'post' (old version)
-                st.warning(f"API translation unavailable ({str(attr_e)}). Trying local...")
-                response = translate_local(english_response, "en", "ml")
-            except Exception as trans_e:
-                st.warning(f"Translation error: {str(trans_e)}. Using local fallback.")
-                response = translate_local(english_response, "en", "ml")
-        else:
-            response = english_response
-
-        return response if response else "No advice generated."
-    except Exception as e:
-        st.error(f"AI Error: {str(e)}")
-        return f"AI temporarily unavailable. Sample for '{query}': Use neem oil sprays and monitor fields daily for {farmer_data.get('crop', 'your crop')}."
-
-# Add this helper function (Local translation – Below generate_ai_response or at top)
-@st.cache_resource  # Loads model once (downloads ~300MB first time)
-def load_translator():
-    from transformers import pipeline
-    return pipeline("translation", model="Helsinki-NLP/opus-mt-en-ml")
-
-def translate_local(text, src_lang, tgt_lang):
-    try:
-        translator = load_translator()
-        result = translator(text, max_length=300)
-        return result[0]['translation_text']
-    except Exception as local_e:
-        st.error(f"Local translation failed: {str(local_e)}. Install transformers: pip install transformers")
-        return text  # Ultimate fallback: English
-    
 API_KEY = os.getenv("OPENWEATHER_API_KEY")
 st.session_state.language = 'en'
 if VOICE_AVAILABLE:
@@ -170,7 +99,7 @@ st.markdown("""
 # Clean Sidebar: User Profile Only + Logout
 with st.sidebar:
     st.header("👤 User Profile")
-    user = st.session_state.get('user', {})  # Ensure dict
+    user = current_profile() or {}  # Farmer record (dict-style access) or empty
     if user and len(user) > 0:
         st.write(f"**Name:** {user.get('name', 'Unknown')}")
         st.write(f"**Crop:** {user.get('crop', 'General')}")
@@ -182,11 +111,35 @@ with st.sidebar:
     else:
         st.info("👋 Welcome! Login to start.")
 
+    readiness = start_warmup().status()  # Farmers may land here first: start warm-up if app.py hasn't
+    if readiness['state'] == 'warming':
+        st.caption(f"⏳ Warming up: {readiness['running'] or 'models'} ({readiness['elapsed_s']:.0f}s) – first answers may be slower")
+
+    if CACHE_AVAILABLE:
+        cache_stats = get_response_cache().stats()
+        st.caption(f"⚡ Advice cache: {cache_stats['hit_rate']:.0%} hits ({cache_stats['exact_hits']} exact, {cache_stats['near_hits']} similar, {cache_stats['misses']} misses)")
+    if AI_AVAILABLE:
+        advice_flight = flight_stats().get('advice')
+        if advice_flight and advice_flight['collapsed']:
+            st.caption(f"🔗 {advice_flight['collapsed']} identical requests shared an in-flight answer")
+        translator_stats = batch_stats()
+        if translator_stats and translator_stats['batches']:
+            st.caption(f"🈳 Local translator: {translator_stats['mean_batch_size']:.1f} sentences/batch, queue {translator_stats['queue_depth']}")
+        tm_stats = memory_stats()
+        if tm_stats and tm_stats['stored']:
+            st.caption(f"📖 Translation memory: {tm_stats['stored']} sentences, {tm_stats['hit_rate']:.0%} reused")
+        model_stats = get_registry().stats()
+        if model_stats['models']:
+            st.caption(f"🧠 Models in memory: {model_stats['resident_mb']:.0f}/{model_stats['budget_mb']} MB ({', '.join(model_stats['models'])})")
+        queue_stats = get_scheduler().stats()
+        if queue_stats['queued']:
+            st.caption(f"⏳ AI queue: {queue_stats['running']}/{queue_stats['concurrency']} busy, {queue_stats['queued_now']} waiting, p95 wait {queue_stats['queue_wait_p95_ms']} ms")
+
     # Logout (Keep at bottom)
     if st.session_state.logged_in:
         st.write(f"Logged in as: {st.session_state.username}")
         if st.button("🚪 Logout", key='logout_btn'):
-            for key in ['logged_in', 'username', 'farmer_id', 'user', 'fcm_token', 'voice_transcript', 'ai_response']:
+            for key in ['logged_in', 'username', 'farmer_id', 'user', 'fcm_token', 'voice_transcript', 'ai_response', 'history_more', 'history_cursor', 'history_head', 'last_logged_query']:
                 if key in st.session_state:
                     del st.session_state[key]
             st.success("Logged out successfully!")
@@ -201,16 +154,23 @@ def get_weather(location):
     if not API_KEY or API_KEY == "your_key":
         return "Weather API key needed. Sign up at openweathermap.org and add to .env."
     url = f"http://api.openweathermap.org/data/2.5/weather?q={location}&appid={API_KEY}&units=metric"
+
+    def fetch(timeout):
+        response = requests.get(url, timeout=timeout)
+        if response.status_code >= 500 or response.status_code == 429:
+            response.raise_for_status()  # Retried by the openweather endpoint
+        return response.status_code, response.json()
+
     try:
-        response = requests.get(url)
-        data = response.json()
-        if response.status_code == 200:
+        # Timeouts/retries/breaker; the last good reading is reused while OpenWeather is down
+        status_code, data = get_endpoint('openweather').call(fetch, stale_key=url)
+        if status_code == 200:
             temp = data['main']['temp']
             condition = data['weather'][0]['description']
             humidity = data['main']['humidity']
             # Auto-send alert if rainy (example – Fixed sanitize)
             if 'rain' in condition.lower() and st.session_state.get('fcm_token') and FCM_AVAILABLE:
-                user = st.session_state.get('user', {})
+                user = current_profile() or {}
                 success = send_real_notification(
                     f"Rainy weather in {location}! Protect crops from waterlogging. Temp: {temp}°C, Humidity: {humidity}%",
                     "warning", user
@@ -220,6 +180,8 @@ def get_weather(location):
             return f"🌤️ Temperature: {temp}°C | Condition: {condition.capitalize()} | Humidity: {humidity}%"
         else:
             return "Weather data unavailable. Check location spelling."
+    except CircuitOpenError:
+        return "Weather service is not responding. Please try again in a minute."
     except Exception as e:
         return f"Error fetching weather: {str(e)}"
 
@@ -240,6 +202,8 @@ if st.session_state.logged_in:
                 # Update user dict
                 if 'user' in st.session_state:
                     st.session_state.user['fcm_token'] = pasted_token.strip()
+                if DB_AVAILABLE and st.session_state.get('farmer_id'):
+                    update_farmer_token(st.session_state.farmer_id, pasted_token.strip())  # Also invalidates the shared profile cache
                 st.success(f"✅ Token saved: {pasted_token[:20]}...")
                 st.rerun()
             else:
@@ -249,7 +213,7 @@ if st.session_state.logged_in:
         if st.button("🧪 Test Notification", key='test_notif'):
             token = st.session_state.get('fcm_token')
             if token and FCM_AVAILABLE:
-                user = st.session_state.get('user', {})
+                user = current_profile() or {}
                 success = send_real_notification("🧪 Test Alert", "info", user)  # Use your function
                 if success:
                     st.success("Push sent! Check device/browser.")
@@ -299,7 +263,7 @@ if not st.session_state.logged_in:
                 if saved_farmer:
                     st.session_state.farmer_id = saved_farmer.id
                     st.session_state.username = username
-                    st.session_state.user = get_farmer_data(username)  # Assume returns dict
+                    st.session_state.user = get_profile(username)  # Farmer record via shared cache (supports .get / [] like a dict)
                     st.session_state.logged_in = True
                     st.success(f"✅ Welcome {name}! Profile saved. Your {crop} farm in {location_ml} is ready for advice.")
                     # Update FCM token in DB if available
@@ -326,12 +290,12 @@ if not st.session_state.logged_in:
 
 # Post-Login Sections
 if st.session_state.logged_in:
-    user = st.session_state.get('user', {})  # Dict
-    st.header(f"🌾 Hi {user.get('name', 'Farmer')}! Your Farm: {user.get('crop', 'General')} in {user.get('location_ml', 'Your Area')} | Size: {user.get('farm_size', 2.0)} Acres")
+    user = current_profile() or {}
+    st.header(f"🌾 Hi {user.get('name', 'Farmer')}! Your Farm: {user.get('crop', 'General')} in {user.get('location', 'Your Area')} | Size: {user.get('farm_size', 2.0)} Acres")
 
     # Weather Section
     st.header("☁️ Weather Forecast")
-    location = st.text_input("Enter Location (e.g., Kochi)", value=user.get('location_ml', ''), key='weather_loc')
+    location = st.text_input("Enter Location (e.g., Kochi)", value=user.get('location', ''), key='weather_loc')
     if location:
         weather = get_weather(location)
         st.info(weather)
@@ -380,13 +344,15 @@ if st.session_state.logged_in:
                 with sr.AudioFile(audio_bytes) as source:
                     audio_data = recognizer.record(source)
                 # Transcribe (en-IN for Indian English; ml-IN for Malayalam)
-                text = recognizer.recognize_google(audio_data, language='en-IN')  # Change to 'ml-IN' if needed
+                speech = get_endpoint('google-speech', retry_if=lambda e: isinstance(e, sr.RequestError))
+                recognizer.operation_timeout = speech.timeout  # Don't let a stalled upload hold the script thread
+                text = speech.call(lambda timeout: recognizer.recognize_google(audio_data, language='en-IN'))
                 st.success(f"🎤 Transcribed: {text}")
                 return text
             except sr.UnknownValueError:
                 st.error("Could not understand audio. Please try text input.")
                 return None
-            except sr.RequestError:
+            except (sr.RequestError, CircuitOpenError):
                 st.error("Transcription service unavailable (check internet). Use text input.")
                 return None
             except Exception as e:
@@ -414,20 +380,25 @@ if st.session_state.logged_in:
     # Step 5: Process & Display (Now safe – query_text always defined)
     if query_text.strip():  # Use .strip() to ignore whitespace-only
         # Fetch user data
-        user = st.session_state.get('user', {})  # Dict
+        user = current_profile() or {}
         if not user:
             st.warning("⚠️ Please complete your profile first for personalized advice.")
             st.info("Go to profile section and set crop, location, etc.")
         else:
-            # Generate response (With lang_code)
-            ai_response = generate_ai_response(query_text, user, lang_code)
-            
-            # Display
+            # Generate response (With lang_code) – streamed straight onto the page
             st.success(f"**AI Advice ({selected_lang}):**")
-            st.write(ai_response)
+            ai_response = generate_ai_response(query_text, user, lang_code, stream=True)
+
+            # Log the exchange once per (query, language) – reruns re-render the same answer;
+            # fallbacks and notices are not answers and must not feed search or history
+            if DB_AVAILABLE and st.session_state.get('farmer_id') and getattr(ai_response, 'answered', False):
+                logged_key = (query_text.strip(), lang_code)
+                if st.session_state.get('last_logged_query') != logged_key:
+                    save_query(st.session_state.farmer_id, query_text.strip(), ai_response)  # Queued; committed in background
+                    st.session_state.last_logged_query = logged_key
             
             # Notification Trigger (Firebase Push)
-            if FCM_AVAILABLE and st.session_state.get('fcm_token'):
+            if FCM_AVAILABLE and st.session_state.get('fcm_token') and ai_response:
                 summary = ai_response[:100].replace('\n', ' ')  # Short body
                 success = send_real_notification(f"AI Advice for '{query_text[:30]}...': {summary}", "info", user)
                 if success:
@@ -462,7 +433,7 @@ if st.session_state.logged_in:
             # Add marker for farm location
             folium.Marker(
                 [lat, lon], 
-                popup=f"<b>{user.get('crop', 'Farm')} Farm</b><br>Location: {user.get('location_ml', 'Your Area')}<br>Size: {farm_size} acres<br>Soil: {user.get('soil', 'Loamy')}",
+                popup=f"<b>{user.get('crop', 'Farm')} Farm</b><br>Location: {user.get('location', 'Your Area')}<br>Size: {farm_size} acres<br>Soil: {user.get('soil', 'Loamy')}",
                 tooltip="Click for farm details",
                 icon=folium.Icon(color='green', icon='leaf')  # Green leaf icon for agriculture
             ).add_to(m)
@@ -484,13 +455,13 @@ if st.session_state.logged_in:
             folium.LayerControl().add_to(m)
             
             # Render map in Streamlit
-            st_folium(m, width=700, height=500)
+            streamlit_folium.st_folium(m, width=700, height=500)
             
         except Exception as e:
             st.error(f"Map rendering error: {str(e)}. Install folium and check coordinates.")
-            st.info(f"Placeholder: Your farm is in {user.get('location_ml', 'your location')} – Use Google Maps for now.")
+            st.info(f"Placeholder: Your farm is in {user.get('location', 'your location')} – Use Google Maps for now.")
     else:
-        st.info(f"Map feature requires 'streamlit-folium'. Install it to visualize your {user.get('location_ml', 'location')} farm.")
+        st.info(f"Map feature requires 'streamlit-folium'. Install it to visualize your {user.get('location', 'location')} farm.")
         # Placeholder image
         st.image("https://images.unsplash.com/photo-1441974231531-c6227db76b6e?ixlib=rb-4.0.3&auto=format&fit=crop&w=700&h=400", caption="Sample Kerala Farm View")
 
@@ -498,16 +469,30 @@ if st.session_state.logged_in:
     if DB_AVAILABLE and 'farmer_id' in st.session_state and st.session_state.farmer_id:
         st.header("📋 Your Past Queries")
         try:
-            # Fetch from DB (add this function to backend/database.py if needed)
-            conn = sqlite3.connect('krishi.db')
-            df = pd.read_sql_query("SELECT query, response, created_at FROM queries WHERE farmer_id = ? ORDER BY created_at DESC LIMIT 5", conn, params=(st.session_state.farmer_id,))
-            conn.close()
-            if not df.empty:
-                st.dataframe(df, use_container_width=True)
+            # Newest page is re-read every rerun (indexed, 5 rows); older pages are
+            # appended via the keyset cursor when "Load more" is pressed.
+            rows, next_cursor = get_query_history(st.session_state.farmer_id, limit=5)
+            head = rows[0]['id'] if rows else None
+            if st.session_state.get('history_head') != head:
+                # A new query was logged: the first page shifted down a row, so older pages loaded
+                # from the previous boundary would skip one. Start paging again from this page.
+                st.session_state.history_head = head
+                st.session_state.history_more, st.session_state.history_cursor = [], None
+            more = st.session_state.get('history_more', [])
+            cursor = st.session_state.get('history_cursor') if more else next_cursor
+            rows = rows + more
+            if rows:
+                for row in rows:
+                    with st.expander(f"🕒 {row['created_at']} – {row['query']}"):
+                        st.write(row['response'])
+                if cursor and st.button("⬇️ Load more", key='history_more_btn'):
+                    older, st.session_state.history_cursor = get_query_history(
+                        st.session_state.farmer_id, limit=5, cursor=cursor
+                    )
+                    st.session_state.history_more = more + older
+                    st.rerun()
             else:
                 st.info("No past queries yet. Ask something to start building your history!")
-        except ImportError:
-            st.warning("Pandas not installed for history table. pip install pandas")
         except Exception as e:
             st.error(f"History fetch error: {e}")
 
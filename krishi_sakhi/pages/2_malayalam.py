@@ -2,100 +2,28 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-import speech_recognition as sr
 import io
-from pydub import AudioSegment
-from pydub.exceptions import CouldntDecodeError
-from huggingface_hub import InferenceClient
-from transformers import pipeline
-import torch
 
-load_dotenv()  # Load HF_TOKEN
-
-@st.cache_resource
-def get_hf_client():
-    token = os.getenv('HF_TOKEN')
-    if token:
-        return InferenceClient(token=token)
-    st.error("HF_TOKEN missing in .env file.")
-    return None
-
-def generate_ai_response(query, farmer_data, lang_code="ml"):
-    # Ensure farmer_data is dict (safety)
-    if not isinstance(farmer_data, dict):
-        farmer_data = {}
-    
-    client = get_hf_client()
-    if not client:
-        return "AI ലഭ്യമല്ല. .env-ൽ HF_TOKEN ചേർക്കുക."
+from utils.lazy import lazy_import
+from utils.warmup import start_warmup
 
-    # Profile string (English for AI consistency)
-    profile_str = f"Crop: {farmer_data.get('crop', 'General')}, Location: {farmer_data.get('location', 'Your area')}, Soil: {farmer_data.get('soil', 'Loamy')}, Farm Size: {farmer_data.get('farm_size', 2)} acres."
+# Audio stack loads on the first voice query, not on page load
+sr = lazy_import('speech_recognition')
+pydub = lazy_import('pydub')
+pydub_exceptions = lazy_import('pydub.exceptions')
+start_warmup()  # Farmers may land here first: start warm-up if app.py hasn't
 
-    system_content = """You are Krishi Sakhi, an AI farming expert for Indian farmers in Kerala. Provide simple, practical advice in English. Focus on sustainable, step-by-step guidance. Structure responses with numbered steps if possible."""
-    
-    messages = [
-        {"role": "system", "content": system_content},
-        {"role": "user", "content": f"Query: {query}. Farmer Profile: {profile_str}. Advise in Indian agriculture context."}
-    ]
-
-    try:
-        with st.spinner("AI ഫാമിങ് ഉപദേശം ജനറേറ്റ് ചെയ്യുന്നു..."):
-            completion = client.chat.completions.create(
-                model="HuggingFaceTB/SmolLM3-3B",
-                messages=messages,
-                max_tokens=300,
-                temperature=0.3,
-                top_p=0.9
-            )
-            english_response = completion.choices[0].message.content.strip()
+from utils.profile import current_profile  # Normalized profile shared by all pages
+from utils.advice import generate_ai_response  # One engine for every page (cache, streaming, translation)
+from utils.resilience import CircuitOpenError, get_endpoint  # Timeouts, retries, breaker
 
-        # Translate to Malayalam
-        response = english_response
-        try:
-            with st.spinner("മലയാളത്തിലേക്ക് പരിഭാഷപ്പെടുത്തുന്നു..."):
-                translation_result = client.post(
-                    model="Helsinki-NLP/opus-mt-en-ml",
-                    json={"inputs": english_response}
-                )
-                if isinstance(translation_result, list) and len(translation_result) > 0:
-                    response = translation_result[0].get('translation_text', english_response)
-                else:
-                    raise ValueError("Invalid API response")
-            st.success("പരിഭാഷ വിജയകരം!")
-        except Exception as api_e:
-            st.warning(f"API translation unavailable ({str(api_e)}). Using local...")
-            response = translate_local(english_response, "en", "ml")
-        return response if response else "No advice generated."
-    except Exception as e:
-        st.error(f"AI Error: {str(e)}")
-        return "പേസ്റ്റിന്, നിങ്ങളുടെ ഫലത്തിൽ നീമെണ്ണ സ്പ്രേ ഉപയോഗിക്കുക."
+try:
+    from backend.database import save_query  # Write-behind query log (shared with the English page)
+    DB_AVAILABLE = True
+except ImportError:
+    DB_AVAILABLE = False
 
-@st.cache_resource
-def load_translator():
-    try:
-        device = 0 if torch.cuda.is_available() else -1
-        translator = pipeline(
-            "translation",
-            model="Helsinki-NLP/opus-mt-en-ml",
-            device=device,
-            torch_dtype=torch.float16 if device == 0 else None
-        )
-        return translator
-    except Exception as load_e:
-        st.error(f"Model load failed: {str(load_e)}")
-        return None
-
-def translate_local(text, src_lang, tgt_lang):
-    translator = load_translator()
-    if translator is None:
-        return text
-    try:
-        result = translator(text, max_length=400, min_length=10)
-        return result[0]['translation_text']
-    except Exception as local_e:
-        st.warning(f"Local translation error: {str(local_e)}")
-        return text
+load_dotenv()  # Load HF_TOKEN
 
 def transcribe_audio(audio_file, lang_code="ml"):
     if audio_file is None:
@@ -110,13 +38,13 @@ def transcribe_audio(audio_file, lang_code="ml"):
             wav_bytes = io.BytesIO(audio_bytes)
         else:
             try:
-                audio_segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format=file_extension)
+                audio_segment = pydub.AudioSegment.from_file(io.BytesIO(audio_bytes), format=file_extension)
                 audio_segment = audio_segment.set_frame_rate(16000).set_channels(1)
                 wav_buffer = io.BytesIO()
                 audio_segment.export(wav_buffer, format="wav")
                 wav_bytes = io.BytesIO(wav_buffer.getvalue())
                 st.info(f"{file_extension.upper()}-നെ WAV-ലേക്ക് മാറ്റി.")
-            except CouldntDecodeError:
+            except pydub_exceptions.CouldntDecodeError:
                 st.error(f"{file_extension} ഫയൽ ഡീകോഡ് ചെയ്യാനായില്ല. WAV ഉപയോഗിക്കുക.")
                 return None
             except Exception as conv_e:
@@ -129,13 +57,15 @@ def transcribe_audio(audio_file, lang_code="ml"):
             audio_data = recognizer.record(source)
         
         language = 'ml-IN'
-        text = recognizer.recognize_google(audio_data, language=language)
+        speech = get_endpoint('google-speech', retry_if=lambda e: isinstance(e, sr.RequestError))
+        recognizer.operation_timeout = speech.timeout  # Don't let a stalled upload hold the script thread
+        text = speech.call(lambda timeout: recognizer.recognize_google(audio_data, language=language))
         st.success(f"🎤 പരിഭാഷപ്പെടുത്തി: '{text}'")
         return text.strip()
     except sr.UnknownValueError:
         st.error("ഓഡിയോ മനസ്സിലായില്ല.")
         return None
-    except sr.RequestError as req_e:
+    except (sr.RequestError, CircuitOpenError) as req_e:
         st.error(f"സേവന പിശക്: {str(req_e)}")
         return None
     except Exception as general_e:
@@ -149,7 +79,7 @@ st.write("കേരളത്തിലെ കർഷകർക്കായുള്
 
 # Sidebar (Fixed: Safe Dict Default - No AttributeError)
 st.sidebar.header("👤 ഉപയോക്താവ് / User")
-user = st.session_state.get('user', {})  # Safe: Always dict
+user = current_profile() or {}  # Farmer record (dict-style access) or empty
 if user:  # Check if non-empty dict
     st.sidebar.write(f"പേര്: {user.get('name', 'അജ്ഞാതൻ')}")
     st.sidebar.write(f"ഫലം: {user.get('crop', 'പൊതു')}")
@@ -181,7 +111,7 @@ if not user or st.button("പ്രൊഫൈൽ അപ്ഡേറ്റ് / Up
             st.rerun()  # Refresh to update sidebar
 
 # Display Profile (Fixed: Safe Columns)
-user = st.session_state.get('user', {})  # Re-fetch safe
+user = current_profile() or {}  # Re-fetch safe
 if user:
     st.subheader("നിങ്ങളുടെ പ്രൊഫൈൽ / Your Profile")
     col1, col2 = st.columns(2)
@@ -229,12 +159,18 @@ query_text = st.text_input(
 
 # Process Query (Safe User)
 if query_text.strip():
-    user = st.session_state.get('user', {})  # Safe default
+    user = current_profile() or {}  # Safe default
     if not user:
         st.warning("⚠️ പ്രൊഫൈൽ പൂർത്തിയാക്കുക / Complete profile for better advice.")
-    ai_response = generate_ai_response(query_text, user, "ml")
     st.success("**AI ഉപദേശം (മലയാളം) / AI Advice:**")
-    st.write(ai_response)
+    ai_response = generate_ai_response(query_text, user, "ml", stream=True)  # Renders itself
+
+    # Log once per (query, language) like the English page; fallbacks and notices are not answers
+    if DB_AVAILABLE and st.session_state.get('farmer_id') and getattr(ai_response, 'answered', False):
+        logged_key = (query_text.strip(), "ml")
+        if st.session_state.get('last_logged_query') != logged_key:
+            save_query(st.session_state.farmer_id, query_text.strip(), ai_response)  # Queued; committed in background
+            st.session_state.last_logged_query = logged_key
     
     # Download (Safe Filename)
     if ai_response:
@@ -4,8 +4,16 @@ import os
 import requests
 from dotenv import load_dotenv
 
+from utils.profile import current_profile  # Normalized profile shared by all pages
+from utils.resilience import CircuitOpenError, get_endpoint  # Timeouts, retries, breaker
+
 load_dotenv()  # Load API keys
 
+def _fetch_weather(base_url, params, timeout):
+    response = requests.get(base_url, params=params, timeout=timeout)
+    response.raise_for_status()  # 5xx/429 are retried; 4xx (unknown city) surfaces at once
+    return response.json()
+
 def get_weather(location, api_key):
     """Fetch weather from OpenWeatherMap API"""
     if not location:
@@ -18,9 +26,11 @@ def get_weather(location, api_key):
         'lang': 'en'  # English labels
     }
     try:
-        response = requests.get(base_url, params=params)
-        if response.status_code == 200:
-            data = response.json()
+        # Last good reading for this place is served while OpenWeather is down
+        data = get_endpoint('openweather').call(
+            lambda timeout: _fetch_weather(base_url, params, timeout), stale_key=(params['q'], params['lang'])
+        )
+        if data:
             return {
                 'city': data['name'],
                 'temp': data['main']['temp'],
@@ -30,9 +40,13 @@ def get_weather(location, api_key):
                 'icon': data['weather'][0]['icon'],
                 'wind_speed': data['wind']['speed']
             }
-        else:
-            st.error(f"API Error: {response.status_code} - Location not found?")
-            return None
+        return None
+    except CircuitOpenError:
+        st.warning("Weather service is not responding. Please try again in a minute.")
+        return None
+    except requests.HTTPError as http_e:
+        st.error(f"API Error: {http_e.response.status_code} - Location not found?")
+        return None
     except Exception as e:
         st.error(f"Weather fetch error: {str(e)}")
         return None
@@ -44,8 +58,8 @@ st.write("Get local weather for farming decisions. Uses your profile location.")
 
 # Sidebar (Mirrors English Profile Page: Safe User Display)
 st.sidebar.header("👤 User")
-if 'user' in st.session_state and st.session_state.user is not None:
-    user = st.session_state['user']
+user = current_profile() or {}  # Farmer record (dict-style access) or empty
+if user:
     st.sidebar.write(f"Name: {user.get('name', 'Unknown')}")
     st.sidebar.write(f"Crop: {user.get('crop', 'General')}")
     st.sidebar.write(f"Location: {user.get('location', 'N/A')}")  # Key for weather
@@ -59,8 +73,8 @@ if not api_key:
     st.stop()
 
 location = None
-if 'user' in st.session_state and st.session_state.user is not None:
-    location = st.session_state.user.get('location', None)
+if user and user.get('location'):
+    location = user.get('location')
 else:
     st.warning("⚠️ Complete profile (English/Malayalam page) for personalized weather.")
     location = st.text_input("Enter Location (e.g., Thrissur)", placeholder="Thrissur")
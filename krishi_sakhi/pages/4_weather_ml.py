@@ -4,8 +4,16 @@ import os
 import requests
 from dotenv import load_dotenv
 
+from utils.profile import current_profile  # Normalized profile shared by all pages
+from utils.resilience import CircuitOpenError, get_endpoint  # Timeouts, retries, breaker
+
 load_dotenv()  # Load API keys
 
+def _fetch_weather(base_url, params, timeout):
+    response = requests.get(base_url, params=params, timeout=timeout)
+    response.raise_for_status()  # 5xx/429 are retried; 4xx (unknown city) surfaces at once
+    return response.json()
+
 def get_weather(location, api_key):
     """Fetch weather from OpenWeatherMap API (Same as English)"""
     if not location:
@@ -18,9 +26,11 @@ def get_weather(location, api_key):
         'lang': 'hi'  # Hindi for better ML approximation; translate manually
     }
     try:
-        response = requests.get(base_url, params=params)
-        if response.status_code == 200:
-            data = response.json()
+        # Last good reading for this place is served while OpenWeather is down
+        data = get_endpoint('openweather').call(
+            lambda timeout: _fetch_weather(base_url, params, timeout), stale_key=(params['q'], params['lang'])
+        )
+        if data:
             return {
                 'city': data['name'],
                 'temp': data['main']['temp'],
@@ -30,9 +40,13 @@ def get_weather(location, api_key):
                 'icon': data['weather'][0]['icon'],
                 'wind_speed': data['wind']['speed']
             }
-        else:
-            st.error(f"API Error: {response.status_code} - Location not found?")
-            return None
+        return None
+    except CircuitOpenError:
+        st.warning("കാലാവസ്ഥ സേവനം ഇപ്പോൾ ലഭ്യമല്ല. ഒരു മിനിറ്റിന് ശേഷം ശ്രമിക്കുക. / Weather service is not responding.")
+        return None
+    except requests.HTTPError as http_e:
+        st.error(f"API Error: {http_e.response.status_code} - Location not found?")
+        return None
     except Exception as e:
         st.error(f"Weather fetch error: {str(e)}")
         return None
@@ -62,8 +76,8 @@ st.write("നിങ്ങളുടെ സ്ഥലത്തെ കാലാവ
 
 # Sidebar (Mirrors Malayalam Profile Page)
 st.sidebar.header("👤 ഉപയോക്താവ് / User")
-if 'user' in st.session_state and st.session_state.user is not None:
-    user = st.session_state['user']
+user = current_profile() or {}  # Farmer record (dict-style access) or empty
+if user:
     st.sidebar.write(f"പേര്: {user.get('name', 'അജ്ഞാതൻ')}")
     st.sidebar.write(f"ഫലം: {user.get('crop', 'പൊതു')}")
     st.sidebar.write(f"സ്ഥലം: {user.get('location', 'N/A')}")
@@ -77,8 +91,8 @@ if not api_key:
     st.stop()
 
 location = None
-if 'user' in st.session_state and st.session_state.user is not None:
-    location = st.session_state.user.get('location', None)
+if user and user.get('location'):
+    location = user.get('location')
 else:
     st.warning("⚠️ പ്രൊഫൈൽ പൂർത്തിയാക്കുക വ്യക്തിഗത വെതറിന്.")
     location = st.text_input("സ്ഥലം നൽകുക (e.g., തൃശ്ശൂർ)", placeholder="തൃശ്ശൂർ")
@@ -0,0 +1,5 @@
+# tests/conftest.py – Run the suite from anywhere: modules import as `utils.*` / `backend.*`
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
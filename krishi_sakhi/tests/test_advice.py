@@ -0,0 +1,72 @@
+# tests/test_advice.py – generate_ai_response: What Gets Cached and What Counts as an Answer
+import pytest
+
+pytest.importorskip('streamlit')
+
+from backend.response_cache import ResponseCache  # noqa: E402
+from utils import advice  # noqa: E402
+from utils.streaming import track_stream  # noqa: E402
+
+PROFILE = {'id': 1, 'crop': 'paddy', 'soil': 'clay', 'location': 'Palakkad'}
+ANSWER = ['1. Keep', ' drainage', ' channels', ' open', ' after', ' rain.']
+
+
+class Rerun(BaseException):
+    """Stands in for Streamlit's rerun/stop exception."""
+
+
+class FakeEngine:
+    def available(self):
+        return True
+
+    def stream(self, query, profile, stats, on_finish=None, history=None):
+        return track_stream(iter(ANSWER), stats, on_finish)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(path=str(tmp_path / 'krishi.db'))
+    monkeypatch.setattr(advice, 'get_response_cache', lambda: cache)
+    monkeypatch.setattr(advice, 'get_engine', lambda: FakeEngine())
+    monkeypatch.setattr(advice, 'KB_AVAILABLE', False)
+    monkeypatch.setattr(advice, 'HISTORY_AVAILABLE', False)
+    return cache
+
+
+def test_abandoned_stream_is_not_cached(cache, monkeypatch):
+    def write_stream(tokens):
+        for _, _token in zip(range(3), tokens):
+            pass
+        tokens.close()  # Consumer goes away mid-answer
+        raise Rerun()
+
+    monkeypatch.setattr(advice.st, 'write_stream', write_stream)
+    with pytest.raises(Rerun):
+        advice.generate_ai_response('How to manage waterlogging?', PROFILE, stream=True)
+    assert cache.get('How to manage waterlogging?', PROFILE, 'en') is None
+    assert cache.get('How to manage waterlogging?', dict(PROFILE, id=2), 'en') is None
+
+
+def test_finished_stream_is_cached(cache):
+    response = advice.generate_ai_response('How to manage waterlogging?', PROFILE)
+    assert response == ''.join(ANSWER) and response.answered
+    assert cache.get('How to manage waterlogging?', PROFILE, 'en') == response
+    assert advice.generate_ai_response('How to manage waterlogging?', PROFILE).answered  # Cache hit
+
+
+def test_fallbacks_are_not_answers(cache, monkeypatch):
+    monkeypatch.setattr(FakeEngine, 'available', lambda self: False)
+    response = advice.generate_ai_response('How to manage waterlogging?', dict(PROFILE, id=3))
+    assert response == advice.MESSAGES['unavailable']['en'] and not response.answered
+
+
+def test_cut_short_answer_is_not_an_answer(cache, monkeypatch):
+    def broken(self, query, profile, stats, on_finish=None, history=None):
+        def deltas():
+            yield from ANSWER[:2]
+            raise ConnectionError('upstream dropped')
+        return track_stream(deltas(), stats, on_finish)
+
+    monkeypatch.setattr(FakeEngine, 'stream', broken)
+    response = advice.generate_ai_response('How to manage waterlogging?', dict(PROFILE, id=4))
+    assert response == ''.join(ANSWER[:2]) and not response.answered
@@ -0,0 +1,45 @@
+# tests/test_archive.py – Archive Reads Stream Line by Line and Skip Months Outside the Range
+import gzip
+
+from backend import archive
+
+
+def _write(archive_dir, month, rows):
+    for row in rows:
+        row.setdefault('created_at', f'{month}-15 10:00:00')
+        row.setdefault('response', '')
+    archive._append_partition(archive.partition_path(f'{month}-01', str(archive_dir)), rows)
+
+
+def _rows(tmp_path):
+    _write(tmp_path, '2024-01', [{'id': 1, 'farmer_id': 1, 'query': 'paddy blast'},
+                                 {'id': 2, 'farmer_id': 2, 'query': 'paddy blast spray'}])
+    _write(tmp_path, '2024-02', [{'id': 3, 'farmer_id': 1, 'query': 'banana wilt', 'created_at': '2024-02-01 08:00:00'},
+                                 {'id': 4, 'farmer_id': 1, 'query': 'coconut mite', 'created_at': '2024-02-20 08:00:00'}])
+    _write(tmp_path, '2024-02', [{'id': 4, 'farmer_id': 1, 'query': 'coconut mite', 'created_at': '2024-02-20 08:00:00'}])
+
+
+def test_iter_filters_dedupes_and_orders_newest_first(tmp_path):
+    _rows(tmp_path)
+    ids = [r['id'] for r in archive.iter_archived_queries(farmer_id=1, archive_dir=str(tmp_path))]
+    assert ids == [4, 3, 1]  # Farmer 2 dropped, crash-retry copy of 4 dropped
+    ids = [r['id'] for r in archive.iter_archived_queries(archive_dir=str(tmp_path), since='2024-02-10')]
+    assert ids == [4]  # Row-level bound inside the boundary month
+
+
+def test_months_outside_the_range_are_never_opened(tmp_path, monkeypatch):
+    _rows(tmp_path)
+    opened = []
+    real_open = gzip.open
+    monkeypatch.setattr(gzip, 'open', lambda path, *a, **k: opened.append(path) or real_open(path, *a, **k))
+    list(archive.iter_archived_queries(archive_dir=str(tmp_path), since='2024-02'))
+    assert [p.rsplit('queries-', 1)[1] for p in opened] == ['2024-02.jsonl.gz']
+
+
+def test_search_all_ranks_archived_rows_with_hot_ones(tmp_path, monkeypatch):
+    _rows(tmp_path)
+    hot = [{'id': 10, 'farmer_id': 1, 'query': 'when to sow paddy', 'response': '', 'created_at': '2024-06-01 09:00:00'}]
+    monkeypatch.setattr(archive, 'search_queries', lambda text, limit, farmer_id: [dict(r) for r in hot])
+    results = archive.search_all('paddy blast', farmer_id=1, limit=2, archive_dir=str(tmp_path))
+    assert [(r['id'], r['archived']) for r in results] == [(1, True), (10, False)]
+    assert results[0]['score'] == 2.0
@@ -0,0 +1,53 @@
+# tests/test_conversation.py – History Context Only When It Matters, Stable Across the Logging Rerun
+import pytest
+
+from backend import connection
+from backend.connection import get_pool
+from utils.conversation import HistoryContextBuilder
+from utils.tokens import TokenCounter
+
+EARLIER = [
+    ('Banana sucker planting season?', 'Start of the monsoon.'),
+    ('How to control rhinoceros beetle in coconut?', 'Fill the crown with neem cake and sand.'),
+    ('Dose of potash for banana?', '300 g per plant in two splits.'),
+    ('When to harvest ginger?', 'Eight months after planting.'),
+    ('Why are pepper leaves yellow?', 'Check for quick wilt; drench with Bordeaux.'),
+    ('How to store paddy seed?', 'Dry to 12% moisture, keep in airtight bins.'),
+]
+
+
+@pytest.fixture
+def builder(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, 'DB_PATH', str(tmp_path / 'krishi.db'))
+    counter = TokenCounter(name='no/such-tokenizer')
+    counter._tried = True  # Character fallback, no download
+    return HistoryContextBuilder(budget=400, counter=counter)
+
+
+def _log(farmer_id, query, response):
+    with get_pool().connection() as conn:
+        conn.execute('INSERT INTO queries (farmer_id, query, response) VALUES (?, ?, ?)', (farmer_id, query, response))
+
+
+def test_unrelated_question_gets_no_history(builder):
+    _log(1, 'How to control rhinoceros beetle in coconut?', 'Fill the crown with neem cake and sand.')
+    assert builder.build(1, 'Fertilizer schedule for paddy?') == ''
+
+
+def test_related_question_and_follow_up_get_history(builder):
+    for query, response in EARLIER:
+        _log(1, query, response)
+    assert 'potash' in builder.build(1, 'Potash dose for banana plants?')
+    follow_up = builder.build(1, 'Is it safe to mix that with urea?')
+    assert 'paddy seed' in follow_up  # Newest exchange
+
+
+def test_logging_the_answer_does_not_shift_the_window(builder):
+    for query, response in EARLIER:
+        _log(1, query, response)
+    question = 'Is it safe to spray that again?'
+    before = builder.build(1, question)
+    _log(1, question, 'Yes, after the rain stops.')  # The page logs the answer, then reruns
+    builder._cache.clear()
+    assert builder.build(1, question) == before
+    assert 'sucker planting' in before  # Oldest of the six is still in the window
@@ -0,0 +1,38 @@
+# tests/test_local_backend.py – Local LLM Backend Must Not Hang the Page When Generation Fails
+import types
+
+import pytest
+
+pytest.importorskip('streamlit')
+pytest.importorskip('transformers')
+
+
+class FakeTokenizer:
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+        return messages[-1]['content']
+
+    def __call__(self, prompt, return_tensors=None):
+        return {'input_ids': [[1, 2, 3]]}
+
+    def decode(self, ids, **kwargs):
+        return ''
+
+
+def test_generation_error_reaches_the_consumer(monkeypatch):
+    from utils import advice
+    from utils.model_registry import ModelRegistry
+    from utils.streaming import GenerationStats
+
+    def generate(**kwargs):
+        raise MemoryError('out of memory')
+
+    pipe = types.SimpleNamespace(tokenizer=FakeTokenizer(), model=types.SimpleNamespace(generate=generate))
+    registry = ModelRegistry()
+    monkeypatch.setattr(advice, 'get_registry', lambda: registry)
+    backend = advice.LocalModelBackend(model='fake')
+    registry._loaders[backend.registry_key] = lambda: pipe
+
+    stream = backend.stream([{'role': 'user', 'content': 'hi'}], GenerationStats())
+    with pytest.raises(MemoryError):
+        list(stream)
+    assert registry.stats()['models'][backend.registry_key]['refs'] == 0
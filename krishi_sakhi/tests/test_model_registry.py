@@ -0,0 +1,114 @@
+# tests/test_model_registry.py – Model Registry and Batch Translator Regression Tests
+import gc
+import threading
+import time
+import weakref
+
+import pytest
+
+from utils.batch_translator import BatchTranslator
+from utils.model_registry import ModelRegistry
+
+
+class FakePipe:
+    """Translation-pipeline stand-in: upper-cases its inputs, records batch sizes."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, **kwargs):
+        self.batches.append(len(texts))
+        return [{'translation_text': text.upper()} for text in texts]
+
+
+def test_loads_once_under_concurrency():
+    registry = ModelRegistry()
+    loads = []
+
+    def loader():
+        time.sleep(0.05)
+        loads.append(1)
+        return FakePipe()
+
+    registry.register('m', loader)
+    threads = [threading.Thread(target=registry.acquire, args=('m',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert registry.stats()['models']['m']['refs'] == 8
+
+
+def test_idle_models_evicted_lru_first(monkeypatch):
+    import utils.model_registry as model_registry
+    monkeypatch.setattr(model_registry, 'model_bytes', lambda model: model * 2 ** 20)
+    monkeypatch.setattr(model_registry, '_rss_bytes', lambda: None)
+    registry = ModelRegistry(budget_mb=500)
+    for name, mb in [('a', 300), ('b', 150), ('c', 200)]:
+        registry.register(name, lambda mb=mb: mb)
+    with registry.use('a'):
+        pass
+    with registry.use('b'):
+        pass
+    with registry.use('c'):
+        assert set(registry.stats()['models']) == {'b', 'c'}  # 'a' was idle and least recently used
+    assert registry.stats()['evictions'] == 1
+
+
+def test_in_use_model_is_not_evicted(monkeypatch):
+    import utils.model_registry as model_registry
+    monkeypatch.setattr(model_registry, 'model_bytes', lambda model: model * 2 ** 20)
+    monkeypatch.setattr(model_registry, '_rss_bytes', lambda: None)
+    registry = ModelRegistry(budget_mb=100)
+    registry.register('a', lambda: 80)
+    registry.register('b', lambda: 80)
+    with registry.use('a'), registry.use('b'):
+        assert set(registry.stats()['models']) == {'a', 'b'}
+        assert registry.stats()['over_budget'] >= 1
+
+
+def test_failed_load_is_not_retried_immediately():
+    registry = ModelRegistry(retry_seconds=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        raise RuntimeError('no model')
+
+    registry.register('m', loader)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            registry.acquire('m')
+    assert len(calls) == 1
+
+
+def test_evicted_translator_is_freed_by_batch_worker():
+    registry = ModelRegistry(budget_mb=-1)  # Everything idle is over budget: unload after every batch
+    pipes = []
+
+    def loader():
+        pipes.append(weakref.ref(pipe := FakePipe()))
+        return pipe
+
+    registry.register('translator', loader)
+    batcher = BatchTranslator(lambda: registry.use('translator'), window_ms=1)
+    assert batcher.translate('water daily', timeout=5) == 'WATER DAILY'
+    deadline = time.monotonic() + 2
+    while pipes[0]() is not None and time.monotonic() < deadline:
+        gc.collect()
+        time.sleep(0.01)
+    assert 'translator' not in registry.stats()['models']
+    assert pipes[0]() is None, "the worker must not keep an unloaded pipeline alive"
+    assert batcher.translate('add compost', timeout=5) == 'ADD COMPOST'
+    assert len(pipes) == 2
+
+
+def test_batcher_groups_concurrent_requests():
+    pipe = FakePipe()
+    registry = ModelRegistry()
+    registry.register('translator', lambda: pipe)
+    batcher = BatchTranslator(lambda: registry.use('translator'), max_batch=16, window_ms=50)
+    futures = [batcher.submit(f'step {i}') for i in range(20)]
+    assert [f.result(timeout=5) for f in futures] == [f'STEP {i}' for i in range(20)]
+    assert sum(pipe.batches) == 20 and max(pipe.batches) == 16
@@ -0,0 +1,58 @@
+# tests/test_resilience.py – Circuit Breaker and Endpoint Regression Tests
+import time
+
+from utils.resilience import CircuitBreaker, Endpoint
+
+
+def _open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.failure()
+    time.sleep(0.02)
+    return breaker
+
+
+def test_breaker_half_open_lets_one_probe_through():
+    breaker = _open_breaker()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_abandoned_stream_probe_releases_breaker():
+    endpoint = Endpoint('test', timeout=1, retries=0, breaker=_open_breaker())
+    stream = endpoint.stream(lambda timeout: iter(['a', 'b', 'c']))
+    assert next(stream) == 'a'  # This is the half-open probe
+    stream.close()              # Consumer goes away mid-stream (rerun / navigation)
+    assert endpoint.breaker.allow(), "an abandoned probe must not short-circuit the endpoint forever"
+
+
+def test_stream_not_retried_after_first_delta():
+    calls = []
+
+    def open_stream(timeout):
+        calls.append(1)
+        yield 'a'
+        raise ConnectionError('dropped')
+
+    endpoint = Endpoint('test', timeout=1, retries=2)
+    received = []
+    try:
+        for delta in endpoint.stream(open_stream):
+            received.append(delta)
+    except ConnectionError:
+        pass
+    assert received == ['a'] and len(calls) == 1
+
+
+def test_call_serves_stale_while_open():
+    endpoint = Endpoint('test', timeout=1, retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    assert endpoint.call(lambda timeout: 'fresh', stale_key='k') == 'fresh'
+
+    def down(timeout):
+        raise TimeoutError()
+
+    assert endpoint.call(down, stale_key='k') == 'fresh'
+    assert endpoint.breaker.state == 'open'
+    assert endpoint.call(down, stale_key='k') == 'fresh'
+    assert endpoint.stats()['short_circuited'] == 1
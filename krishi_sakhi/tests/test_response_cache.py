@@ -0,0 +1,49 @@
+# tests/test_response_cache.py – Response Cache Sharing Rules
+import pytest
+
+from backend.response_cache import ResponseCache
+
+PROFILE = {'crop': 'pepper', 'soil': 'laterite', 'location': 'Wayanad'}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(path=str(tmp_path / 'krishi.db'))
+
+
+def test_shared_within_profile_bucket(cache):
+    cache.put('How to control pepper wilt?', PROFILE, 'en', 'Drench with Trichoderma.')
+    assert cache.get('pepper wilt control how', dict(PROFILE, id=2), 'en') == 'Drench with Trichoderma.'
+
+
+def test_scoped_answers_are_not_shared(cache):
+    # A follow-up answered from farmer 1's history must not reach farmer 2 in the same bucket
+    cache.put('What dose?', dict(PROFILE, id=1), 'en', '2 g per litre of Bordeaux.', scope='farmer:1:abc')
+    assert cache.get('What dose?', dict(PROFILE, id=2), 'en') is None
+    assert cache.get('What dose?', dict(PROFILE, id=2), 'en', scope='farmer:2:def') is None
+    assert cache.get('What dose?', dict(PROFILE, id=1), 'en', scope='farmer:1:abc') == '2 g per litre of Bordeaux.'
+
+
+def test_history_scoped_request_keys_differ():
+    pytest.importorskip('streamlit')
+    from utils.advice import history_scope, request_key
+    a = request_key('What dose?', dict(PROFILE, id=1), 'en', history_scope({'id': 1}, 'Farmer: pepper wilt?'))
+    b = request_key('What dose?', dict(PROFILE, id=2), 'en', history_scope({'id': 2}, 'Farmer: banana wilt?'))
+    assert a != b
+    assert request_key('What dose?', PROFILE, 'en', history_scope(PROFILE, None)) == request_key('What dose?', PROFILE, 'en')
+
+
+def test_negation_is_not_a_near_duplicate(cache):
+    cache.put('should I spray fungicide now', PROFILE, 'en', 'Yes, spray before the rain.')
+    assert cache.get('should I not spray fungicide now', PROFILE, 'en') is None
+    assert cache.get("don't spray fungicide now?", PROFILE, 'en') is None
+    assert cache.get('should I spray fungicides now', PROFILE, 'en') == 'Yes, spray before the rain.'
+    assert cache.stats()['near_hits'] == 1
+
+
+def test_different_quantity_is_not_a_near_duplicate(cache):
+    cache.put('how much urea for 1 acre paddy', PROFILE, 'en', '35 kg in three splits.')
+    assert cache.get('how much urea for 5 acre paddy', PROFILE, 'en') is None
+    assert cache.get('how much urea for one acre paddy', PROFILE, 'en') is None
+    assert cache.get('how much urea for 1 acre paddy field', PROFILE, 'en') == '35 kg in three splits.'
+    assert cache.stats()['near_hits'] == 1
@@ -0,0 +1,114 @@
+# tests/test_scheduler.py – Admission Control and Fair Scheduling Regression Tests
+import threading
+import time
+
+import pytest
+
+from utils.scheduler import FairScheduler, QueueFull, QueueTimeout, RateLimited
+
+
+class Rerun(BaseException):
+    """Stands in for Streamlit's RerunException / StopException (BaseException subclasses)."""
+
+
+def _hold(scheduler, user):
+    # Occupy a slot until the returned event is set
+    release, held = threading.Event(), threading.Event()
+
+    def run():
+        with scheduler.slot(user):
+            held.set()
+            release.wait()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    held.wait()
+    return release, thread
+
+
+def test_rate_limit_per_user():
+    scheduler = FairScheduler(rate_per_min=60, burst=2)
+    scheduler.admit('a')
+    scheduler.admit('a')
+    with pytest.raises(RateLimited) as exc:
+        scheduler.admit('a')
+    assert 0 < exc.value.retry_after <= 1.0
+    scheduler.admit('b')  # Other farmers are unaffected
+
+
+def test_round_robin_across_users():
+    scheduler = FairScheduler(concurrency=1, max_queued_per_user=3)
+    release, holder = _hold(scheduler, 'x')
+    order, threads = [], []
+
+    def job(user, i):
+        with scheduler.slot(user):
+            order.append(f'{user}{i}')
+
+    for user, i in [('a', 0), ('a', 1), ('a', 2), ('b', 0), ('c', 0)]:
+        thread = threading.Thread(target=job, args=(user, i))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.02)
+    release.set()
+    for thread in threads + [holder]:
+        thread.join()
+    assert order == ['a0', 'b0', 'c0', 'a1', 'a2']
+
+
+def test_queue_full_and_timeout():
+    scheduler = FairScheduler(concurrency=1, max_queued_per_user=1, max_wait=0.6)
+    release, holder = _hold(scheduler, 'x')
+    errors = []
+
+    def wait():
+        try:
+            scheduler._acquire('a')
+        except QueueTimeout as e:
+            errors.append(e)
+
+    waiting = threading.Thread(target=wait)
+    waiting.start()
+    time.sleep(0.05)
+    with pytest.raises(QueueFull):
+        with scheduler.slot('a'):
+            pass
+    waiting.join()
+    assert len(errors) == 1
+    release.set()
+    holder.join()
+    stats = scheduler.stats()
+    assert stats['timeouts'] == 1 and stats['queued_now'] == 0 and stats['running'] == 0
+
+
+def test_interrupted_waiter_does_not_leak_a_slot():
+    scheduler = FairScheduler(concurrency=1)
+    release, holder = _hold(scheduler, 'x')
+
+    def rerun(position, waited):
+        raise Rerun()
+
+    with pytest.raises(Rerun):
+        with scheduler.slot('a', on_wait=rerun):
+            pass
+    release.set()
+    holder.join()
+    stats = scheduler.stats()
+    assert stats['running'] == 0 and stats['queued_now'] == 0
+    with scheduler.slot('b') as waited:  # Free slot straight away, no QueueTimeout
+        assert waited == 0.0
+
+
+def test_interrupt_after_slot_granted_releases_it():
+    scheduler = FairScheduler(concurrency=1)
+    release, holder = _hold(scheduler, 'x')
+
+    def rerun(position, waited):
+        release.set()       # The slot frees up and is handed to us...
+        holder.join()
+        raise Rerun()       # ...just as the script is interrupted
+
+    with pytest.raises(Rerun):
+        with scheduler.slot('a', on_wait=rerun):
+            pass
+    assert scheduler.stats()['running'] == 0
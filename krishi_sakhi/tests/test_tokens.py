@@ -0,0 +1,32 @@
+# tests/test_tokens.py – Token Counting Without the Conversation/Database Stack
+import os
+import subprocess
+import sys
+
+import pytest
+
+from utils.tokens import TokenCounter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_character_fallback_counts_and_truncates():
+    counter = TokenCounter(name='no/such-tokenizer')
+    counter._tried = True  # Skip the download attempt: fallback mode
+    assert not counter.exact
+    assert counter.count('') == 0
+    assert counter.count('abcd') == 1
+    text = 'water the field early in the morning before the heat'
+    cut = counter.truncate(text, 5)
+    assert cut.endswith('…') and len(cut) <= 5 * 4 + 1
+    assert counter.truncate('short', 5) == 'short'
+
+
+def test_translation_does_not_import_the_history_stack():
+    pytest.importorskip('streamlit')
+    code = ("import sys, utils.translation; "
+            "print(','.join(m for m in ('utils.conversation', 'backend.database', 'backend.search') if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True,
+                         env={**os.environ, 'PYTHONPATH': os.pathsep.join([ROOT] + sys.path)})
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == ''
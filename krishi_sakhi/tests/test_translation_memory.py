@@ -0,0 +1,34 @@
+# tests/test_translation_memory.py – Stored-Row Count Is Kept in Memory, Not Re-Counted per Rerun
+import sqlite3
+
+from backend.translation_memory import TM_COUNT_TTL, TranslationMemory
+
+
+def _count(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute('SELECT COUNT(*) FROM translation_memory').fetchone()[0]
+
+
+def test_stored_count_tracks_inserts_replaces_and_prunes(tmp_path):
+    path = str(tmp_path / 'tm.db')
+    memory = TranslationMemory('test-model', path=path, max_rows=3)
+    assert memory.stats()['stored'] == 0
+
+    memory.put_many([('One.', 'ഒന്ന്.'), ('Two.', 'രണ്ട്.')])
+    memory.put_many([('one.', 'ഒന്ന്.'), ('Three.', 'മൂന്ന്.')])  # "one." replaces "One."
+    assert memory.stats()['stored'] == _count(path) == 3
+
+    memory._puts = 499  # Next put prunes to max_rows
+    memory.put_many([('Four.', 'നാല്.'), ('Five.', 'അഞ്ച്.')])
+    assert memory._stored == _count(path) == 3
+
+
+def test_stored_count_is_not_requeried_within_the_ttl(tmp_path):
+    path = str(tmp_path / 'tm.db')
+    memory = TranslationMemory('test-model', path=path)
+    memory.stats()
+    with sqlite3.connect(path) as conn:  # Another process writes behind our back
+        conn.execute("INSERT INTO translation_memory (key, source, target, created_at) VALUES ('k', 's', 't', 0)")
+    assert memory.stats()['stored'] == 0  # Served from memory until the TTL re-read
+    memory._stored_at -= TM_COUNT_TTL + 1
+    assert memory.stats()['stored'] == 1
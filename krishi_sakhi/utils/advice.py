@@ -0,0 +1,469 @@
+# utils/advice.py – Single Advice Engine (Pluggable Backends, One Prompt Builder)
+# Backend is picked with KRISHI_ADVICE_BACKEND: hf (default) | local | offline
+import hashlib
+import math
+import os
+import queue
+import threading
+
+import streamlit as st
+from dotenv import load_dotenv
+
+from utils.model_registry import get_registry
+from utils.resilience import CircuitOpenError, get_endpoint
+from utils.scheduler import QueueFull, QueueTimeout, RateLimited, get_scheduler
+from utils.singleflight import get_flight
+from utils.streaming import GenerationStats, stream_chat_completion, track_stream
+from utils.translation import translate_stream, translate_to_malayalam
+
+try:
+    from backend.advisory import format_entry, get_knowledge_base  # Offline curated guidance (fast path, RAG, fallback)
+    KB_AVAILABLE = True
+except ImportError:
+    KB_AVAILABLE = False
+
+try:
+    from utils.conversation import get_context_builder  # Farmer's earlier exchanges within a token budget
+    HISTORY_AVAILABLE = True
+except ImportError:
+    HISTORY_AVAILABLE = False
+
+try:
+    from backend.response_cache import get_response_cache, normalize_query, profile_fingerprint  # Persistent exact/near-duplicate advice cache
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
+
+load_dotenv()
+
+ADVICE_BACKEND = os.getenv('KRISHI_ADVICE_BACKEND', 'hf')
+HF_MODEL = os.getenv('KRISHI_HF_MODEL', 'HuggingFaceTB/SmolLM3-3B')
+LOCAL_MODEL = os.getenv('KRISHI_LOCAL_MODEL', 'HuggingFaceTB/SmolLM2-360M-Instruct')
+LOCAL_TOKEN_TIMEOUT = float(os.getenv('KRISHI_LOCAL_TOKEN_TIMEOUT', '60'))  # Max seconds between local-model tokens
+MAX_TOKENS = 300
+TEMPERATURE = 0.3
+TOP_P = 0.9
+KB_FAST_PATH = os.getenv('KRISHI_KB_FAST_PATH', '1') == '1'  # Answer confident KB matches without the LLM
+
+SYSTEM_PROMPT = (
+    "You are Krishi Sakhi, an AI farming expert for Indian farmers in Kerala. "
+    "Provide simple, practical advice in English. Focus on sustainable, step-by-step guidance. "
+    "Structure responses with numbered steps if possible."
+)
+
+MESSAGES = {
+    'unavailable': {"en": "AI unavailable. Add HF_TOKEN to .env.", "ml": "AI ലഭ്യമല്ല. .env-ൽ HF_TOKEN ചേർക്കുക."},
+    'shared': {"en": "Same question is being answered for another farmer – joining it...", "ml": "ഇതേ ചോദ്യത്തിന് ഉത്തരം തയ്യാറാകുന്നു..."},
+    'rate_limited': {"en": "You're asking faster than we can answer everyone. Please wait {seconds}s before your next question.", "ml": "ചോദ്യങ്ങൾ വളരെ വേഗത്തിലാണ്. അടുത്ത ചോദ്യത്തിന് മുമ്പ് {seconds} സെക്കൻഡ് കാത്തിരിക്കുക."},
+    'queued': {"en": "⏳ Many farmers are asking right now – {ahead} question(s) ahead of yours ({seconds:.0f}s)...", "ml": "⏳ ഇപ്പോൾ ധാരാളം ചോദ്യങ്ങളുണ്ട് – നിങ്ങൾക്ക് മുമ്പ് {ahead} ചോദ്യങ്ങൾ ({seconds:.0f} സെ.)..."},
+    'queue_full': {"en": "Your previous question is still waiting for an answer. Please let it finish first.", "ml": "നിങ്ങളുടെ മുൻ ചോദ്യം ഇപ്പോഴും ഉത്തരം കാത്തിരിക്കുന്നു. അത് പൂർത്തിയാകട്ടെ."},
+    'queue_timeout': {"en": "The advice service is very busy right now.", "ml": "ഉപദേശ സേവനം ഇപ്പോൾ വളരെ തിരക്കിലാണ്."},
+    'generating': {"en": "Generating AI farming advice...", "ml": "AI ഫാമിങ് ഉപദേശം ജനറേറ്റ് ചെയ്യുന്നു..."},
+    'kb_source': {"en": "📚 From the offline advisory guide (instant answer)", "ml": "📚 ഓഫ്‌ലൈൻ ഉപദേശ ഗൈഡിൽ നിന്ന്"},
+    'kb_fallback': {"en": "AI is unavailable right now. Closest guidance from the offline advisory guide:", "ml": "AI ഇപ്പോൾ ലഭ്യമല്ല. ഓഫ്‌ലൈൻ ഉപദേശ ഗൈഡിൽ നിന്ന്:"},
+    'empty': {"en": "No advice generated.", "ml": "ഉപദേശം ലഭിച്ചില്ല. / No advice generated."},
+    'fallback': {
+        "en": "AI temporarily unavailable. Please try again shortly or contact your local Krishi Bhavan.",
+        "ml": "AI താൽക്കാലികമായി ലഭ്യമല്ല. കുറച്ച് കഴിഞ്ഞ് വീണ്ടും ശ്രമിക്കുക അല്ലെങ്കിൽ അടുത്തുള്ള കൃഷിഭവനുമായി ബന്ധപ്പെടുക.",
+    },
+}
+
+
+def _msg(key, lang_code):
+    return MESSAGES[key].get(lang_code, MESSAGES[key]["en"])
+
+
+# ---------------------------------------------------------------- prompt
+
+def profile_value(profile, name, default):
+    """Read a profile field from a Farmer record, dict or plain object alike."""
+    if profile is None:
+        return default
+    value = profile.get(name) if hasattr(profile, 'get') else getattr(profile, name, None)
+    return default if value in (None, '') else value
+
+
+def build_messages(query, profile, context=None, history=None):
+    location = profile_value(profile, 'location', None) or profile_value(profile, 'location_ml', 'Your area')
+    profile_str = (
+        f"Crop: {profile_value(profile, 'crop', 'General')}, Location: {location}, "
+        f"Soil: {profile_value(profile, 'soil', 'Loamy')}, Farm Size: {profile_value(profile, 'farm_size', 2)} acres."
+    )
+    user_content = f"Query: {query}. Farmer Profile: {profile_str}. Advise in Indian agriculture context."
+    if history:
+        # Earlier exchanges so follow-ups ("what dose?", "and for the seedlings?") make sense
+        user_content = f"Earlier conversation with this farmer:\n{history}\n\n{user_content}"
+    if context:
+        # Grounding from the curated knowledge base; the model adapts it rather than inventing doses
+        user_content += f"\nReference guidance (Kerala package of practices):\n{context}\nUse it where relevant."
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_content},
+    ]
+
+
+def kb_context(query, profile):
+    if not KB_AVAILABLE:
+        return None
+    try:
+        return get_knowledge_base().context(query, profile) or None
+    except Exception:
+        return None  # Grounding is optional; a broken KB file must not block advice
+
+
+def history_scope(profile, history):
+    """Cache/coalescing scope for an answer shaped by this farmer's history (None when there was none)."""
+    if not history:
+        return None
+    digest = hashlib.sha1(history.encode('utf-8')).hexdigest()[:16]
+    return f"farmer:{profile_value(profile, 'id', '')}:{digest}"
+
+
+def history_context(query, profile):
+    farmer_id = profile_value(profile, 'id', None)
+    if not HISTORY_AVAILABLE or farmer_id is None:
+        return None
+    try:
+        return get_context_builder().build(farmer_id, query) or None
+    except Exception:
+        return None  # History is a nice-to-have; never fail the answer over it
+
+
+# ---------------------------------------------------------------- shared clients
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_hf_client(endpoint='hf-chat'):
+    """
+    One InferenceClient per (token, endpoint) for the whole process (HTTP sessions
+    are reused across sessions), carrying that endpoint's timeout.
+    """
+    token = os.getenv("HF_TOKEN") or os.getenv("HUGGINGFACE_API_KEY")
+    if not token:
+        return None
+    client = _clients.get((token, endpoint))
+    if client is None:
+        with _clients_lock:
+            client = _clients.get((token, endpoint))
+            if client is None:
+                from huggingface_hub import InferenceClient
+                client = _clients[(token, endpoint)] = InferenceClient(token=token, timeout=get_endpoint(endpoint).timeout)
+    return client
+
+
+# ---------------------------------------------------------------- backends
+
+class HFInferenceBackend:
+    """Hosted chat completion on the HF Inference API."""
+    name = 'hf'
+
+    def available(self):
+        return get_hf_client() is not None
+
+    def translation_client(self):
+        return get_hf_client('hf-translation')
+
+    def stream(self, messages, stats, on_finish=None):
+        return stream_chat_completion(
+            get_hf_client(), messages, stats, on_finish=on_finish, endpoint=get_endpoint('hf-chat'),
+            model=HF_MODEL, max_tokens=MAX_TOKENS, temperature=TEMPERATURE, top_p=TOP_P,
+        )
+
+
+class LocalModelBackend:
+    """Small instruct model on CPU via transformers; loaded once per process (model registry) on first use."""
+    name = 'local'
+
+    def __init__(self, model=LOCAL_MODEL):
+        self.model = model
+        self.registry_key = f"llm:{model}"
+        get_registry().register(self.registry_key, self._load)
+
+    def available(self):
+        return True
+
+    def translation_client(self):
+        return None  # Fully local: translate with the local opus-mt model too
+
+    def _load(self):
+        from transformers import pipeline
+        return pipeline("text-generation", model=self.model, device=-1)
+
+    def stream(self, messages, stats, on_finish=None):
+        from transformers import TextIteratorStreamer
+        registry = get_registry()
+        pipe = registry.acquire(self.registry_key)  # Held until generation ends, so it can't be unloaded mid-answer
+        try:
+            tokenizer = pipe.tokenizer
+            prompt = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+            inputs = tokenizer(prompt, return_tensors="pt")
+            streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True,
+                                            timeout=LOCAL_TOKEN_TIMEOUT)
+        except BaseException:
+            registry.release(self.registry_key)
+            raise
+        errors = []
+
+        def generate():
+            try:
+                pipe.model.generate(**inputs, streamer=streamer, max_new_tokens=MAX_TOKENS,
+                                    do_sample=True, temperature=TEMPERATURE, top_p=TOP_P)
+            except BaseException as e:
+                errors.append(e)  # Handed to the consumer below
+                streamer.end()    # Otherwise the reader waits for an end signal that never comes
+            finally:
+                registry.release(self.registry_key)
+
+        def deltas():
+            try:
+                yield from streamer
+            except queue.Empty:
+                raise TimeoutError(f"Local model produced no text for {LOCAL_TOKEN_TIMEOUT:.0f}s") from None
+            if errors:
+                raise errors[0]
+
+        threading.Thread(target=generate, daemon=True).start()
+        return track_stream(deltas(), stats, on_finish)
+
+
+class OfflineStubBackend:
+    """Deterministic canned advice (same query + profile → same text); for tests and load runs."""
+    name = 'offline'
+
+    STEPS = (
+        "Inspect the field every morning and note any new pest or disease signs.",
+        "Spray neem oil (5 ml per litre of water) in the evening for sucking pests.",
+        "Keep drainage channels clear so water does not stand around the roots.",
+        "Apply well-rotted compost before the next irrigation cycle.",
+        "Remove and destroy badly affected leaves or plants to stop the spread.",
+        "Consult the local Krishi Bhavan before using any chemical pesticide.",
+    )
+
+    def available(self):
+        return True
+
+    def translation_client(self):
+        return None
+
+    def _text(self, messages):
+        digest = hashlib.sha1(messages[-1]["content"].encode("utf-8")).digest()
+        picks = [self.STEPS[b % len(self.STEPS)] for b in digest[:3]]
+        picks = list(dict.fromkeys(picks))
+        return " ".join(f"{i}. {step}" for i, step in enumerate(picks, start=1))
+
+    def stream(self, messages, stats, on_finish=None):
+        words = self._text(messages).split(" ")
+        return track_stream((w if i == 0 else " " + w for i, w in enumerate(words)), stats, on_finish)
+
+
+BACKENDS = {
+    'hf': HFInferenceBackend,
+    'local': LocalModelBackend,
+    'offline': OfflineStubBackend,
+}
+
+
+_AUTO = object()  # AdviceEngine.stream: look the farmer's history up itself
+
+
+class AdviceEngine:
+    """Prompt building + backend dispatch. UI-free: returns token streams and plain text."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def available(self):
+        return self.backend.available()
+
+    def stream(self, query, profile, stats, on_finish=None, history=_AUTO):
+        if history is _AUTO:
+            history = history_context(query, profile)
+        messages = build_messages(query, profile, kb_context(query, profile), history)
+        return self.backend.stream(messages, stats, on_finish)
+
+    def complete(self, query, profile):
+        stats = GenerationStats()
+        text = "".join(self.stream(query, profile, stats)).strip()
+        return text, stats
+
+    def translate(self, text):
+        return translate_to_malayalam(text, self.backend.translation_client())
+
+    def translate_stream(self, tokens):
+        """Malayalam sentences, each translated while the rest of the English answer is still generating."""
+        return translate_stream(tokens, self.backend.translation_client())
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                backend_cls = BACKENDS.get(ADVICE_BACKEND, HFInferenceBackend)
+                _engine = AdviceEngine(backend_cls())
+    return _engine
+
+
+# ---------------------------------------------------------------- Streamlit entry point
+
+def request_key(query, profile, lang_code, scope=None):
+    """Requests that would get the same answer share a key (same normal form the response cache uses)."""
+    if CACHE_AVAILABLE:
+        return profile_fingerprint(profile, lang_code, scope), normalize_query(query)
+    return lang_code, profile_value(profile, 'crop', ''), scope, ' '.join((query or '').lower().split())
+
+
+def requester_key(profile):
+    """Whose quota a request spends: the farmer when logged in, else the browser session."""
+    farmer_id = profile_value(profile, 'id', None)
+    if farmer_id is not None:
+        return f"farmer:{farmer_id}"
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        if ctx is not None:
+            return f"session:{ctx.session_id}"
+    except Exception:
+        pass
+    return 'anonymous'
+
+
+class Advice(str):
+    """Text generate_ai_response showed; `answered` is False for fallbacks, notices and cut-short answers."""
+
+    def __new__(cls, text, answered=True):
+        advice = super().__new__(cls, text)
+        advice.answered = answered
+        return advice
+
+
+def generate_ai_response(query, farmer_data, lang_code="en", stream=False):
+    """
+    The one advice function every page calls.
+    stream=True renders the answer itself (English token by token, Malayalam sentence
+    by sentence as each translation lands), so callers must not st.write it again.
+    Identical requests already running in another session are joined, not repeated.
+    Returns an Advice (a str; log it only if .answered), or None (after a warning)
+    when the farmer is over their question quota.
+    """
+    def done(text, answered=True):
+        if stream:
+            st.write(text)
+        return Advice(text, answered)
+
+    engine = get_engine()
+    cache = get_response_cache() if CACHE_AVAILABLE else None
+    # Same question from the same crop/soil/district/language bucket → reuse the answer
+    # An answer built on this farmer's earlier questions is theirs alone: scope cache and coalescing to it
+    history = history_context(query, farmer_data)
+    scope = history_scope(farmer_data, history)
+    cached = cache.get(query, farmer_data, lang_code, scope) if cache else None
+    if cached:
+        return done(cached)
+
+    def localized(text):
+        if lang_code != "ml":
+            return text
+        try:
+            return engine.translate(text)
+        except Exception:
+            return text
+
+    # Common questions: curated answer in milliseconds, no LLM round trip
+    hit = get_knowledge_base().answer(query, farmer_data) if KB_AVAILABLE and KB_FAST_PATH else None
+    if hit:
+        response = done(localized(format_entry(hit['entry'])))
+        if stream:
+            st.caption(_msg('kb_source', lang_code))
+        return response
+
+    def fallback(message_key):
+        # Best offline guidance instead of a fixed sentence; the fixed sentence only if nothing matches
+        hits = get_knowledge_base().search(query, farmer_data, limit=1) if KB_AVAILABLE else []
+        if hits and (hits[0]['crop_match'] or hits[0]['coverage'] >= 0.5):
+            st.info(_msg('kb_fallback', lang_code))
+            return done(localized(format_entry(hits[0]['entry'])), answered=False)
+        return done(_msg(message_key, lang_code), answered=False)
+
+    if not engine.available():
+        return fallback('unavailable')
+
+    # Quota: every LLM-bound question spends a token from the farmer's bucket (cache/KB answers are free)
+    scheduler = get_scheduler()
+    user_key = requester_key(farmer_data)
+    try:
+        scheduler.admit(user_key)
+    except RateLimited as e:
+        st.warning(_msg('rate_limited', lang_code).format(seconds=math.ceil(e.retry_after)))
+        return None
+
+    # Outbreak bursts: one upstream completion (and translation) per distinct request
+    flight = get_flight('advice')
+    key = request_key(query, farmer_data, lang_code, scope)
+    call, leader = flight.join(key)
+    if not leader:
+        try:
+            with st.spinner(_msg('shared', lang_code)):
+                shared = flight.follow(call)
+                return done(shared) if shared else done(_msg('empty', lang_code), answered=False)
+        except Exception as e:
+            if not isinstance(e, CircuitOpenError):
+                st.error(f"AI Error: {str(e)}")
+            return fallback('fallback')
+
+    status = st.empty()
+
+    def show_queue(ahead, waited):
+        status.info(_msg('queued', lang_code).format(ahead=ahead, seconds=waited))
+
+    stats = GenerationStats()
+    try:
+        # One of a few shared upstream slots, handed out round-robin across farmers
+        with scheduler.slot(user_key, on_wait=show_queue) as waited:
+            status.empty()
+            stats = GenerationStats()  # Time to first token starts once the slot is ours
+            tokens = engine.stream(query, farmer_data, stats, history=history)
+            if lang_code == "ml":
+                tokens = engine.translate_stream(tokens)  # English sentences are translated as they complete
+            if stream:
+                response = st.write_stream(tokens).strip()
+                queued = f"queued {waited:.1f}s · " if waited >= 0.1 else ""
+                st.caption(f"⏱️ {queued}{stats.summary()}")
+            else:
+                with st.spinner(_msg('generating', lang_code)):
+                    response = "".join(tokens).strip()
+        # Only a finished answer is cached: a stream cut short (rerun, navigation, stall) stays on
+        # screen and in stats.text, but must never come back as a hit for this or another farmer
+        if response and cache and stats.completed:
+            cache.put(query, farmer_data, lang_code, response, scope)
+        call.resolve(response)
+        return Advice(response) if response else done(_msg('empty', lang_code), answered=False)
+    except QueueFull as e:
+        call.fail(e)
+        status.empty()
+        st.warning(_msg('queue_full', lang_code))
+        return None
+    except QueueTimeout as e:
+        call.fail(e)
+        status.empty()
+        st.warning(_msg('queue_timeout', lang_code))
+        return fallback('fallback')
+    except Exception as e:
+        call.fail(e)
+        if stats.text and lang_code == "en":
+            st.warning(f"Answer cut short ({str(e)}). Showing what was generated.")
+            return Advice(stats.text, answered=False)  # Already on screen when streaming
+        if not isinstance(e, CircuitOpenError):  # Breaker open: go straight to offline guidance, quietly
+            st.error(f"AI Error: {str(e)}")
+        return fallback('fallback')
+    except BaseException:
+        call.fail(RuntimeError("Shared request was interrupted"))  # Rerun/stop: release the followers
+        raise
+    finally:
+        flight.forget(key)
@@ -0,0 +1,124 @@
+# utils/batch_translator.py – Cross-Session Micro-Batching for the Local Translation Pipeline
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from utils.model_registry import get_registry
+
+BATCH_MAX_SIZE = int(os.getenv('KRISHI_TRANSLATION_BATCH_SIZE', '16'))
+BATCH_WINDOW_MS = float(os.getenv('KRISHI_TRANSLATION_BATCH_WINDOW_MS', '20'))  # Wait this long for company
+BATCH_MAX_LENGTH = 400  # Output tokens; inputs are segmented to KRISHI_TRANSLATION_CHUNK_TOKENS, well under this
+
+
+class BatchTranslator:
+    """
+    Sole user of the (not thread-safe) translation pipeline. Sessions submit
+    single strings; one worker thread gathers whatever arrives within `window_ms`
+    of the first request (up to `max_batch`), sorts it by length so padding stays
+    small, runs a single batched forward pass and resolves each caller's Future.
+    lease() is a context manager yielding the pipeline, held only while a batch
+    runs so the model registry may unload it in between.
+    """
+
+    def __init__(self, lease, max_batch=BATCH_MAX_SIZE, window_ms=BATCH_WINDOW_MS, max_length=BATCH_MAX_LENGTH):
+        self.lease = lease
+        self.max_batch = max_batch
+        self.window = window_ms / 1000.0
+        self.max_length = max_length
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.counts = Counter()
+        self.batch_sizes = Counter()  # size -> number of batches
+        self.max_depth = 0
+        self._thread = threading.Thread(target=self._run, name='batch-translator', daemon=True)
+        self._thread.start()
+
+    def submit(self, text):
+        future = Future()
+        self._queue.put((text, future))
+        depth = self._queue.qsize()
+        with self._lock:
+            self.counts['requests'] += 1
+            self.max_depth = max(self.max_depth, depth)
+        return future
+
+    def translate(self, text, timeout=None):
+        return self.submit(text).result(timeout)
+
+    def _gather(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _forward(self, texts):
+        # The pipeline is only referenced inside this frame: once the lease ends nothing here keeps
+        # it alive, so a model the registry unloads between batches is actually freed
+        with self.lease() as pipe:
+            return pipe(texts, max_length=self.max_length, batch_size=len(texts))
+
+    def _run(self):
+        while True:
+            batch = [(text, future) for text, future in self._gather() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            batch.sort(key=lambda item: len(item[0]))
+            started = time.perf_counter()
+            try:
+                results = self._forward([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                with self._lock:
+                    self.counts['failed_batches'] += 1
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result['translation_text'])
+            with self._lock:
+                self.counts['batches'] += 1
+                self.counts['translated'] += len(batch)
+                self.counts['busy_ms'] += int((time.perf_counter() - started) * 1000)
+                self.batch_sizes[len(batch)] += 1
+
+    def stats(self):
+        with self._lock:
+            batches = self.counts['batches']
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_depth,
+                'requests': self.counts['requests'],
+                'batches': batches,
+                'failed_batches': self.counts['failed_batches'],
+                'mean_batch_size': self.counts['translated'] / batches if batches else 0.0,
+                'max_batch_size': max(self.batch_sizes) if self.batch_sizes else 0,
+                'batch_size_histogram': dict(sorted(self.batch_sizes.items())),
+                'mean_batch_ms': self.counts['busy_ms'] / batches if batches else 0.0,
+            }
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batch_translator(model='translator'):
+    """Process-wide batcher over the registry's `model` pipeline (loaded by the first batch)."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = BatchTranslator(lambda: get_registry().use(model))
+    return _batcher
+
+
+def batch_stats():
+    return _batcher.stats() if _batcher is not None else None
@@ -0,0 +1,144 @@
+# utils/conversation.py – Token-Budgeted Conversation Context from a Farmer's Query History
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from backend.database import get_query_history
+from backend.response_cache import normalize_query
+from backend.search import search_queries
+from utils.tokens import TokenCounter
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv('KRISHI_CONTEXT_TOKENS', '400'))  # Tokens of history per prompt
+CONTEXT_RECENT = int(os.getenv('KRISHI_CONTEXT_RECENT', '6'))          # Newest exchanges considered
+CONTEXT_RELEVANT = int(os.getenv('KRISHI_CONTEXT_RELEVANT', '5'))      # FTS matches considered
+CONTEXT_CACHE_SIZE = int(os.getenv('KRISHI_CONTEXT_CACHE_SIZE', '1000'))
+CONTEXT_MIN_OVERLAP = float(os.getenv('KRISHI_CONTEXT_MIN_OVERLAP', '0.5'))  # Share of this question's words a past one must have
+
+# Questions that lean on an earlier exchange ("is it safe for them?", "what about banana?")
+_FOLLOW_UP_RE = re.compile(
+    r"\b(it|its|they|them|their|that|those|these|same|again|also|else|instead|then|"
+    r"previous|earlier|above|you said|what about|how about|and if)\b"
+)
+
+
+def _normal(text):
+    return ' '.join((text or '').lower().split())
+
+
+def is_follow_up(query):
+    return bool(_FOLLOW_UP_RE.search(_normal(query)))
+
+
+def _relevant(query, hit, min_overlap=CONTEXT_MIN_OVERLAP):
+    # FTS ORs every word, so any shared word is a hit; require the past question to cover the topic
+    words = set(normalize_query(query).split())
+    return bool(words) and len(words & set(normalize_query(hit['query']).split())) / len(words) >= min_overlap
+
+
+class HistoryContextBuilder:
+    """
+    Picks the farmer's past exchanges that matter for this question – past
+    questions on the same topic, plus the newest few when the question is a
+    follow-up – and packs them, most useful first, into `budget` tokens. The
+    result is rendered oldest-first so the model reads it as a conversation.
+    Unrelated questions get no history, so their answers stay shareable.
+    Earlier asks of the current question are left out before the row limits,
+    so logging this answer doesn't shift the window on the next rerun. Built
+    contexts are cached per (farmer, question) and reused until the farmer
+    asks something new.
+    """
+
+    def __init__(self, budget=CONTEXT_TOKEN_BUDGET, counter=None, recent=CONTEXT_RECENT,
+                 relevant=CONTEXT_RELEVANT, max_size=CONTEXT_CACHE_SIZE):
+        self.budget = budget
+        self.counter = counter or TokenCounter()
+        self.recent = recent
+        self.relevant = relevant
+        self.max_size = max_size
+        self._cache = OrderedDict()  # (farmer_id, question) -> (newest history id, context)
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def _candidates(self, query, recent_rows, hits):
+        current = _normal(query)
+        scored = {}
+        for rank, row in enumerate(recent_rows):
+            scored[row['id']] = [row, 1.0 / (1 + rank)]  # Recency: 1, 1/2, 1/3, ...
+        top = max((h['score'] for h in hits), default=0) or 1.0
+        for hit in hits:
+            entry = scored.setdefault(hit['id'], [hit, 0.0])
+            entry[1] += 2.0 * hit['score'] / top  # Relevance outweighs recency
+        return sorted(
+            (entry for entry in scored.values()
+             if entry[0].get('response') and _normal(entry[0]['query']) != current),
+            key=lambda entry: entry[1], reverse=True,
+        )
+
+    def _pack(self, candidates):
+        used, chosen = 0, []
+        per_answer = max(self.budget // 3, 32)  # One long answer must not crowd out the rest
+        for row, _score in candidates:
+            answer = self.counter.truncate(row['response'].strip(), per_answer)
+            text = f"Farmer: {row['query'].strip()}\nKrishi Sakhi: {answer}"
+            cost = self.counter.count(text) + 1
+            if used + cost > self.budget:
+                continue  # A shorter, lower-ranked exchange may still fit
+            used += cost
+            chosen.append((row['created_at'] or '', row['id'], text))
+        chosen.sort()
+        return '\n'.join(text for _, _, text in chosen), used
+
+    def build(self, farmer_id, query):
+        """History context for this farmer and question, or '' if there is none."""
+        if farmer_id is None or self.budget <= 0:
+            return ''
+        recent_rows, _ = get_query_history(farmer_id, limit=self.recent, exclude_query=query)
+        if not recent_rows:
+            return ''
+        version = recent_rows[0]['id']
+        key = (farmer_id, _normal(query))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] == version:
+                self._cache.move_to_end(key)
+                self.counts['hits'] += 1
+                return cached[1]
+            self.counts['builds'] += 1
+        hits = search_queries(query, limit=self.relevant, farmer_id=farmer_id, exclude_query=query)
+        hits = [hit for hit in hits if _relevant(query, hit)]
+        if not is_follow_up(query):
+            recent_rows = []  # A fresh topic: only past questions about it, not whatever came last
+        context, used = self._pack(self._candidates(query, recent_rows, hits)) if recent_rows or hits else ('', 0)
+        with self._lock:
+            self._cache[key] = (version, context)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+            self.counts['tokens'] += used
+        return context
+
+    def stats(self):
+        with self._lock:
+            builds = self.counts['builds']
+            return {
+                'size': len(self._cache),
+                'hits': self.counts['hits'],
+                'builds': builds,
+                'mean_tokens': self.counts['tokens'] / builds if builds else 0.0,
+                'budget': self.budget,
+                'exact_tokenizer': self.counter.exact if self.counter._tried else None,
+            }
+
+
+_builder = None
+_builder_lock = threading.Lock()
+
+
+def get_context_builder():
+    global _builder
+    if _builder is None:
+        with _builder_lock:
+            if _builder is None:
+                _builder = HistoryContextBuilder()
+    return _builder
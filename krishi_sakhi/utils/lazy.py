@@ -0,0 +1,88 @@
+# utils/lazy.py – Lazy Imports for Heavy Optional Modules (Loaded on First Attribute Access)
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+import types
+
+_lazy = {}           # name -> LazyModule
+_import_seconds = {}  # name -> seconds the real import took
+_lock = threading.RLock()
+
+
+class LazyModule(types.ModuleType):
+    """
+    Placeholder bound at module top (`sr = lazy_import('speech_recognition')`);
+    the real import runs on first attribute access, so a page that never touches
+    the microphone or the map never pays for speech_recognition or folium.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with _lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    _import_seconds.setdefault(self.__name__, time.perf_counter() - started)
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name):
+    """A LazyModule for `name` (one per name per process); already-imported modules are returned as-is."""
+    if name in sys.modules:
+        return sys.modules[name]
+    with _lock:
+        module = _lazy.get(name)
+        if module is None:
+            module = _lazy[name] = LazyModule(name)
+        return module
+
+
+def module_available(name):
+    """True if `name` can be imported – checked without importing it."""
+    if name in sys.modules:
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False  # Parent package missing
+
+
+def preload(names=None):
+    """Import lazy modules now (all registered ones by default); returns {name: error} for failures."""
+    with _lock:
+        targets = [_lazy[n] for n in (names or list(_lazy)) if n in _lazy]
+    errors = {}
+    for module in targets:
+        try:
+            module._load()
+        except Exception as e:
+            errors[module.__name__] = str(e)
+    return errors
+
+
+def import_stats():
+    with _lock:
+        return {
+            'registered': sorted(_lazy),
+            'loaded': sorted(n for n, m in _lazy.items() if m.__dict__['_module'] is not None),
+            'import_seconds': {n: round(s, 3) for n, s in sorted(_import_seconds.items())},
+        }
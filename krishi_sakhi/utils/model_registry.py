@@ -0,0 +1,213 @@
+# utils/model_registry.py – Process-Wide Model Registry (Load Once, Ref-Counted, RAM Budget, LRU Unload)
+import gc
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+MODEL_RAM_BUDGET_MB = float(os.getenv('KRISHI_MODEL_RAM_MB', '2048'))  # Resident models allowed before idle ones are unloaded
+MODEL_RETRY_SECONDS = float(os.getenv('KRISHI_MODEL_RETRY', '60'))    # A failed load is not retried before this
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def model_bytes(model):
+    """Parameter + buffer bytes of a torch model or pipeline, or None if it isn't a torch module."""
+    module = getattr(model, 'model', model)
+    if not hasattr(module, 'parameters'):
+        return None
+    try:
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return None
+
+
+def _free_memory():
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+class _Entry:
+    __slots__ = ('model', 'nbytes', 'refs', 'last_used')
+
+    def __init__(self, model, nbytes):
+        self.model = model
+        self.nbytes = nbytes
+        self.refs = 0
+        self.last_used = time.monotonic()
+
+
+class _Loading:
+    __slots__ = ('event', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.error = None
+
+
+class ModelRegistry:
+    """
+    One copy of each model per server process, whichever page or thread asks.
+    acquire(name) loads the model on first use (concurrent callers wait for that
+    one load) and holds a reference until release(name); `with use(name) as m:`
+    does both. Once resident models exceed the RAM budget, models nobody holds
+    are unloaded, least recently used first, and reload on their next use.
+    Sizes are parameter bytes when measurable, else the process RSS growth
+    during the load – good enough for a budget, not exact accounting.
+    """
+
+    def __init__(self, budget_mb=MODEL_RAM_BUDGET_MB, retry_seconds=MODEL_RETRY_SECONDS):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.retry_seconds = retry_seconds
+        self._loaders = {}
+        self._entries = OrderedDict()  # name -> _Entry; order = least recently used first
+        self._loading = {}             # name -> _Loading
+        self._failed = {}              # name -> (monotonic time, error)
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def register(self, name, loader):
+        """loader() -> model; the first registration of a name wins."""
+        with self._lock:
+            self._loaders.setdefault(name, loader)
+
+    def _evict(self, keep=None):
+        # Caller holds the lock; returns the names unloaded
+        evicted = []
+        while sum(e.nbytes for e in self._entries.values()) > self.budget:
+            idle = next((n for n, e in self._entries.items() if e.refs == 0 and n != keep), None)
+            if idle is None:
+                self.counts['over_budget'] += 1  # Everything resident is in use
+                break
+            del self._entries[idle]
+            self.counts['evictions'] += 1
+            evicted.append(idle)
+        return evicted
+
+    def _unloaded(self, names):
+        if names:
+            _free_memory()
+            logger.info("Unloaded idle models %s to stay within %.0f MB", names, self.budget / 2 ** 20)
+
+    def acquire(self, name):
+        """The model, loaded once per process; the caller holds it until release(name)."""
+        while True:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    entry.refs += 1
+                    entry.last_used = time.monotonic()
+                    self._entries.move_to_end(name)
+                    self.counts['hits'] += 1
+                    return entry.model
+                failed = self._failed.get(name)
+                if failed and time.monotonic() - failed[0] < self.retry_seconds:
+                    raise failed[1]
+                pending = self._loading.get(name)
+                if pending is None:
+                    if name not in self._loaders:
+                        raise KeyError(f"No model registered as '{name}'")
+                    loader = self._loaders[name]
+                    pending = self._loading[name] = _Loading()
+                    break  # This caller loads it
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+
+        started, rss_before = time.perf_counter(), _rss_bytes()
+        try:
+            model = loader()
+        except BaseException as e:
+            with self._lock:
+                self._failed[name] = (time.monotonic(), e)
+                del self._loading[name]
+                self.counts['load_failures'] += 1
+            pending.error = e
+            pending.event.set()
+            raise
+        rss_after = _rss_bytes()
+        grown = rss_after - rss_before if rss_before is not None and rss_after is not None else 0
+        entry = _Entry(model, max(model_bytes(model) or 0, grown))
+        entry.refs = 1
+        with self._lock:
+            self._entries[name] = entry
+            self._failed.pop(name, None)
+            del self._loading[name]
+            self.counts['loads'] += 1
+            self.counts['load_ms'] += int((time.perf_counter() - started) * 1000)
+            evicted = self._evict(keep=name)
+        pending.event.set()
+        self._unloaded(evicted)
+        return model
+
+    def release(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return
+            entry.refs = max(entry.refs - 1, 0)
+            entry.last_used = time.monotonic()
+            evicted = self._evict()
+        self._unloaded(evicted)
+
+    @contextmanager
+    def use(self, name):
+        model = self.acquire(name)
+        try:
+            yield model
+        finally:
+            self.release(name)
+
+    def unload(self, name):
+        """Drop an idle model now; False if it is in use or not loaded."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.refs:
+                return False
+            del self._entries[name]
+        self._unloaded([name])
+        return True
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            models = {
+                name: {'mb': round(e.nbytes / 2 ** 20, 1), 'refs': e.refs, 'idle_s': round(now - e.last_used)}
+                for name, e in self._entries.items()
+            }
+            return {
+                'resident_mb': round(sum(e.nbytes for e in self._entries.values()) / 2 ** 20, 1),
+                'budget_mb': round(self.budget / 2 ** 20),
+                'models': models,
+                'registered': sorted(self._loaders),
+                **{k: self.counts[k] for k in ('loads', 'load_ms', 'hits', 'evictions', 'load_failures', 'over_budget')},
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -1,15 +1,32 @@
 # utils/notifications.py – Real Firebase FCM Push Notifications
 import streamlit as st
-import firebase_admin
-from firebase_admin import credentials, messaging
-from firebase_admin.exceptions import FirebaseError
 import os
 from dotenv import load_dotenv
 from datetime import datetime
 import json
 
+from utils.lazy import lazy_import, module_available
+from utils.resilience import CircuitOpenError, get_endpoint, is_transient
+
+if not module_available('firebase_admin'):
+    raise ImportError("firebase-admin is not installed")  # Callers treat this module as optional
+
+# firebase_admin (and its Google API client stack) loads on the first push, not at import
+firebase_admin = lazy_import('firebase_admin')
+credentials = lazy_import('firebase_admin.credentials')
+messaging = lazy_import('firebase_admin.messaging')
+firebase_exceptions = lazy_import('firebase_admin.exceptions')
+
 load_dotenv()
 
+# FCM error codes worth another attempt; bad/expired tokens are not
+FCM_TRANSIENT_CODES = {'UNAVAILABLE', 'INTERNAL', 'DEADLINE_EXCEEDED', 'UNKNOWN', 'RESOURCE_EXHAUSTED'}
+
+
+def _fcm_transient(error):
+    code = getattr(error, 'code', None)
+    return code in FCM_TRANSIENT_CODES if code else is_transient(error)
+
 # Initialize Firebase (Cloud/Local Safe)
 @st.cache_resource
 def init_firebase():
@@ -26,7 +43,8 @@ def init_firebase():
         else:
             creds = credentials.Certificate(json.loads(creds_dict))
         
-        firebase_admin.initialize_app(creds)
+        # httpTimeout bounds every FCM request (firebase_admin waits forever by default)
+        firebase_admin.initialize_app(creds, {'httpTimeout': get_endpoint('fcm').timeout})
         return True
     except Exception as e:
         st.error(f"Firebase init error: {str(e)}. Notifications disabled.")
@@ -45,10 +63,14 @@ def send_fcm_notification(title, body, fcm_token):
             notification=messaging.Notification(title=title, body=body),
             token=fcm_token,
         )
-        response = messaging.send(message)
+        fcm = get_endpoint('fcm', retry_if=_fcm_transient)
+        response = fcm.call(lambda timeout: messaging.send(message))
         st.success(f"Push sent! Message ID: {response}")
         return True
-    except FirebaseError as e:
+    except CircuitOpenError:
+        st.warning("Push service is not responding right now; alert not sent.")
+        return False
+    except firebase_exceptions.FirebaseError as e:
         st.error(f"FCM error: {e} (Check token validity).")
         return False
     except Exception as e:
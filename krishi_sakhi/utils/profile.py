@@ -0,0 +1,37 @@
+# utils/profile.py – One Normalized Farmer Profile Shared by All Pages
+import streamlit as st
+
+from backend.records import Farmer
+
+try:
+    from backend.database import get_profile
+except ImportError:
+    get_profile = None
+
+
+def current_profile():
+    """
+    The session's profile as a Farmer record, or None if nobody has filled one in.
+    - A profile typed on the Malayalam page (plain dict with 'location') is converted once.
+    - A logged-in user with no session copy is loaded through the shared LRU cache.
+    The result is stored back in st.session_state.user, so later reruns never touch SQLite.
+    """
+    user = st.session_state.get('user')
+    if isinstance(user, Farmer):
+        return user
+
+    username = st.session_state.get('username')
+    if user:
+        profile = Farmer.from_mapping(user)
+        if username and st.session_state.get('farmer_id'):
+            profile.username = profile.username or username
+            profile.id = profile.id or st.session_state.farmer_id
+    elif username and get_profile is not None:
+        profile = get_profile(username)
+    else:
+        return None
+
+    if profile is not None:
+        st.session_state.user = profile
+    return profile
+
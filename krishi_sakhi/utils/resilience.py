@@ -0,0 +1,290 @@
+# utils/resilience.py – Timeouts, Jittered Retries, Hedged Requests & Circuit Breakers for Upstream Calls
+import os
+import random
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeout
+
+# Per-endpoint defaults; any value can be overridden with KRISHI_<ENDPOINT>_<SETTING>,
+# e.g. KRISHI_OPENWEATHER_TIMEOUT=3 or KRISHI_HF_CHAT_RETRIES=0
+ENDPOINTS = {
+    'hf-chat':        {'timeout': 60.0, 'retries': 1, 'hedge_percentile': None},  # Streams: retried only before the first token
+    'hf-translation': {'timeout': 20.0, 'retries': 2, 'hedge_percentile': 0.90},
+    'openweather':    {'timeout': 5.0,  'retries': 2, 'hedge_percentile': 0.95},
+    'google-speech':  {'timeout': 15.0, 'retries': 1, 'hedge_percentile': None},
+    'fcm':            {'timeout': 10.0, 'retries': 2, 'hedge_percentile': None},  # Not idempotent: never hedge
+}
+DEFAULT_ENDPOINT = {'timeout': 10.0, 'retries': 1, 'hedge_percentile': None}
+FAILURE_THRESHOLD = int(os.getenv('KRISHI_BREAKER_FAILURES', '5'))   # Consecutive failures that open a breaker
+RESET_TIMEOUT = float(os.getenv('KRISHI_BREAKER_RESET', '30'))       # Seconds open before one probe is let through
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 4.0
+HEDGE_MIN_SAMPLES = 20
+STALE_CACHE_SIZE = 256
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+
+def is_transient(error):
+    """Worth retrying (and counting against the breaker): timeouts, connection trouble, 5xx and 429."""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is not None:
+        return status >= 500 or status == 429
+    return isinstance(error, (TimeoutError, FutureTimeout, ConnectionError, OSError))
+
+
+class CircuitBreaker:
+    """closed → (threshold consecutive failures) → open → (reset_timeout) → half-open: one probe decides."""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half-open'
+                self._probing = False
+            if self.state == 'half-open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def retry_in(self):
+        with self._lock:
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)) if self.state == 'open' else 0.0
+
+    def success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def abandon(self):
+        """The probe ended without a verdict (caller went away): let the next call probe instead."""
+        with self._lock:
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half-open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='hedge')
+
+
+class Endpoint:
+    """
+    One upstream service. call(fn) runs fn(timeout) – fn must pass `timeout` to
+    its client so a slow upstream can't hold the script thread – with jittered
+    exponential backoff between retries, an optional hedge (a second identical
+    request once the first is slower than the recent `hedge_percentile` latency),
+    and a circuit breaker that fails fast while the upstream is down.
+    """
+
+    def __init__(self, name, timeout, retries, hedge_percentile=None, retry_if=is_transient, breaker=None):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.hedge_percentile = hedge_percentile
+        self.retry_if = retry_if
+        self.breaker = breaker or CircuitBreaker()
+        self._latencies = deque(maxlen=200)
+        self._stale = OrderedDict()  # Last good result per key, served while the upstream is failing
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.counts[key] += n
+
+    def percentile(self, q):
+        with self._lock:
+            values = sorted(self._latencies)
+        return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+    def _hedge_delay(self):
+        if self.hedge_percentile is None or len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return self.percentile(self.hedge_percentile)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))  # Full jitter
+
+    def _open_error(self):
+        return CircuitOpenError(f"{self.name} is temporarily unavailable; retrying in {self.breaker.retry_in():.0f}s")
+
+    def _attempt(self, fn):
+        delay = self._hedge_delay()
+        if delay is None:
+            return fn(self.timeout)
+        first = _hedge_pool.submit(fn, self.timeout)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeout:
+            pass  # Slower than usual: race a second copy against it
+        self._count('hedged')
+        second = _hedge_pool.submit(fn, self.timeout)
+        error = None
+        for future in as_completed([first, second], timeout=self.timeout):
+            if future.exception() is None:
+                if future is second:
+                    self._count('hedge_wins')
+                return future.result()
+            error = future.exception()
+        raise error
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._stale[key] = result
+            self._stale.move_to_end(key)
+            while len(self._stale) > STALE_CACHE_SIZE:
+                self._stale.popitem(last=False)
+
+    def _degraded(self, error, fallback, stale_key):
+        with self._lock:
+            has_stale = stale_key is not None and stale_key in self._stale
+            stale = self._stale.get(stale_key)
+        if has_stale:
+            self._count('served_stale')
+            return stale
+        if fallback is not None:
+            self._count('fallbacks')
+            return fallback()
+        raise error
+
+    def call(self, fn, fallback=None, stale_key=None):
+        """
+        fn(timeout) with retries/hedging/breaker. When the breaker is open or all
+        attempts fail: the last good result for `stale_key` if there is one, else
+        fallback(), else the error (CircuitOpenError when short-circuited).
+        """
+        self._count('calls')
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            return self._degraded(self._open_error(), fallback, stale_key)
+        error = None
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                result = self._attempt(fn)
+            except Exception as e:
+                if not self.retry_if(e):
+                    self.breaker.success()  # The upstream answered; the request itself was bad
+                    raise
+                self.breaker.failure()
+                self._count('failures')
+                error = e
+                if attempt == self.retries or not self.breaker.allow():
+                    break
+                self._count('retries')
+                time.sleep(self._backoff(attempt))
+                continue
+            with self._lock:
+                self._latencies.append(time.perf_counter() - started)
+            self.breaker.success()
+            if stale_key is not None:
+                self._remember(stale_key, result)
+            return result
+        return self._degraded(error, fallback, stale_key)
+
+    def stream(self, open_stream):
+        """
+        Yield from open_stream(timeout) with breaker protection. A failed stream is
+        retried only while nothing has been yielded, so text is never duplicated.
+        """
+        self._count('calls')
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise self._open_error()
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            yielded = False
+            try:
+                for delta in open_stream(self.timeout):
+                    if not yielded:
+                        yielded = True
+                        with self._lock:
+                            self._latencies.append(time.perf_counter() - started)  # Time to first delta
+                    yield delta
+            except Exception as e:
+                if not self.retry_if(e):
+                    self.breaker.success()
+                    raise
+                self.breaker.failure()
+                self._count('failures')
+                if yielded or attempt >= self.retries or not self.breaker.allow():
+                    raise
+                self._count('retries')
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                self.breaker.abandon()  # Stream closed mid-way (rerun, navigation): don't leave a probe stuck
+                raise
+            self.breaker.success()
+            return
+
+    def stats(self):
+        p50, p95 = self.percentile(0.50), self.percentile(0.95)
+        with self._lock:
+            return {
+                'state': self.breaker.state,
+                'p50_ms': round(p50 * 1000) if p50 is not None else None,
+                'p95_ms': round(p95 * 1000) if p95 is not None else None,
+                **{k: self.counts[k] for k in ('calls', 'failures', 'retries', 'hedged', 'hedge_wins',
+                                               'short_circuited', 'served_stale', 'fallbacks')},
+            }
+
+
+_endpoints = {}
+_endpoints_lock = threading.Lock()
+
+
+def _setting(name, key, default):
+    value = os.getenv(f"KRISHI_{name.upper().replace('-', '_')}_{key.upper()}")
+    if value is None:
+        return default
+    if value.lower() in ('', 'none', 'off'):
+        return None
+    return type(default)(value) if default is not None else float(value)
+
+
+def get_endpoint(name, retry_if=None):
+    """Process-wide Endpoint for `name` (config from ENDPOINTS + env); retry_if applies on first use."""
+    endpoint = _endpoints.get(name)
+    if endpoint is None:
+        with _endpoints_lock:
+            endpoint = _endpoints.get(name)
+            if endpoint is None:
+                config = ENDPOINTS.get(name, DEFAULT_ENDPOINT)
+                endpoint = _endpoints[name] = Endpoint(
+                    name,
+                    timeout=_setting(name, 'timeout', config['timeout']),
+                    retries=_setting(name, 'retries', config['retries']),
+                    hedge_percentile=_setting(name, 'hedge_percentile', config['hedge_percentile']),
+                    retry_if=retry_if or is_transient,
+                )
+    return endpoint
+
+
+def endpoint_stats():
+    with _endpoints_lock:
+        return {name: endpoint.stats() for name, endpoint in _endpoints.items()}
@@ -0,0 +1,214 @@
+# utils/scheduler.py – Per-Farmer Admission Control & Fair, Quota-Aware Scheduling of LLM Calls
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+
+USER_RATE_PER_MIN = float(os.getenv('KRISHI_USER_RATE_PER_MIN', '6'))  # Sustained questions per farmer
+USER_BURST = float(os.getenv('KRISHI_USER_BURST', '3'))                 # Back-to-back questions allowed
+LLM_CONCURRENCY = int(os.getenv('KRISHI_LLM_CONCURRENCY', '4'))         # Upstream generations at once
+MAX_QUEUED_PER_USER = int(os.getenv('KRISHI_MAX_QUEUED_PER_USER', '1'))
+MAX_QUEUE_WAIT = float(os.getenv('KRISHI_MAX_QUEUE_WAIT', '45'))         # Seconds before a queued request gives up
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Too many questions; try again in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class QueueFull(Exception):
+    """This farmer already has a request waiting."""
+
+
+class QueueTimeout(TimeoutError):
+    """Waited MAX_QUEUE_WAIT without getting a slot."""
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec, capacity):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self):
+        """(True, 0) if a token was taken, else (False, seconds until one is available). Caller holds the lock."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+
+class _Waiter:
+    __slots__ = ('user', 'event', 'enqueued')
+
+    def __init__(self, user):
+        self.user = user
+        self.event = threading.Event()
+        self.enqueued = time.perf_counter()
+
+
+class FairScheduler:
+    """
+    admit(user) spends one token from the farmer's bucket (RateLimited if empty).
+    slot(user) then holds one of `concurrency` upstream slots for the duration of a
+    generation. When all slots are busy, requests wait in per-farmer queues that
+    are served round-robin, so one busy farmer can't push everyone else back.
+    """
+
+    def __init__(self, concurrency=LLM_CONCURRENCY, rate_per_min=USER_RATE_PER_MIN, burst=USER_BURST,
+                 max_queued_per_user=MAX_QUEUED_PER_USER, max_wait=MAX_QUEUE_WAIT, max_users=10000):
+        self.concurrency = concurrency
+        self.rate = rate_per_min / 60.0
+        self.burst = burst
+        self.max_queued_per_user = max_queued_per_user
+        self.max_wait = max_wait
+        self.max_users = max_users
+        self.running = 0
+        self._buckets = OrderedDict()  # user -> TokenBucket (LRU-bounded)
+        self._queues = OrderedDict()   # user -> deque of _Waiter; order = round-robin rotation
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=1000)
+        self.counts = Counter()
+
+    def admit(self, user):
+        with self._lock:
+            bucket = self._buckets.get(user)
+            if bucket is None:
+                bucket = self._buckets[user] = TokenBucket(self.rate, self.burst)
+                while len(self._buckets) > self.max_users:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(user)
+            ok, retry_after = bucket.take()
+            if not ok:
+                self.counts['rate_limited'] += 1
+                raise RateLimited(retry_after)
+
+    def _position(self, waiter):
+        # Requests that round-robin will serve before this one (caller holds the lock)
+        mine = self._queues.get(waiter.user)
+        if not mine or waiter not in mine:
+            return 0
+        index = mine.index(waiter)
+        others = sum(min(len(q), index + 1) for user, q in self._queues.items() if user != waiter.user)
+        return index + others
+
+    def _dequeue(self, waiter):
+        # Caller holds the lock
+        queue = self._queues.get(waiter.user)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[waiter.user]
+
+    def _dispatch(self):
+        # Hand free slots to the next farmer in rotation (caller holds the lock)
+        while self.running < self.concurrency and self._queues:
+            user, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user)  # Back of the rotation
+            else:
+                del self._queues[user]
+            self.running += 1
+            waiter.event.set()
+
+    def _acquire(self, user, on_wait=None):
+        waiter = _Waiter(user)
+        with self._lock:
+            if self.running < self.concurrency and not self._queues:
+                self.running += 1
+                self.counts['admitted'] += 1
+                self._waits.append(0.0)
+                return 0.0
+            queue = self._queues.get(user)
+            if queue is not None and len(queue) >= self.max_queued_per_user:
+                self.counts['queue_full'] += 1
+                raise QueueFull("A question of yours is already waiting")
+            self._queues.setdefault(user, deque()).append(waiter)
+            self.counts['queued'] += 1
+        deadline = time.perf_counter() + self.max_wait
+        try:
+            while not waiter.event.wait(0.5):
+                with self._lock:
+                    if waiter.event.is_set():
+                        break
+                    if time.perf_counter() >= deadline:
+                        self._dequeue(waiter)
+                        self.counts['timeouts'] += 1
+                        raise QueueTimeout(f"No free slot after {self.max_wait:.0f}s")
+                    position = self._position(waiter)
+                if on_wait is not None:
+                    on_wait(position, time.perf_counter() - waiter.enqueued)
+        except QueueTimeout:
+            raise
+        except BaseException:
+            # on_wait can raise Streamlit's rerun/stop: never leave a waiter (or a slot handed to it) behind
+            with self._lock:
+                granted = waiter.event.is_set()
+                if not granted:
+                    self._dequeue(waiter)
+                    self.counts['abandoned'] += 1
+            if granted:
+                self._release()
+            raise
+        waited = time.perf_counter() - waiter.enqueued
+        with self._lock:
+            self.counts['admitted'] += 1
+            self._waits.append(waited)
+        return waited
+
+    def _release(self):
+        with self._lock:
+            self.running -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, user, on_wait=None):
+        """Hold one upstream slot; yields the seconds spent queueing. on_wait(position, waited) while queued."""
+        waited = self._acquire(user, on_wait)
+        try:
+            yield waited
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            queued = sum(len(q) for q in self._queues.values())
+
+            def pct(q):
+                return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000) if waits else None
+
+            return {
+                'running': self.running,
+                'concurrency': self.concurrency,
+                'queued_now': queued,
+                'admitted': self.counts['admitted'],
+                'queued': self.counts['queued'],
+                'rate_limited': self.counts['rate_limited'],
+                'queue_full': self.counts['queue_full'],
+                'timeouts': self.counts['timeouts'],
+                'abandoned': self.counts['abandoned'],
+                'queue_wait_p50_ms': pct(0.50),
+                'queue_wait_p95_ms': pct(0.95),
+                'queue_wait_max_ms': round(waits[-1] * 1000) if waits else None,
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = FairScheduler()
+    return _scheduler
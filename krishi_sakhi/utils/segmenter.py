@@ -0,0 +1,96 @@
+# utils/segmenter.py – Sentence/Step Segmentation and Token-Bounded Chunks for Translation
+import os
+import re
+from collections import namedtuple
+
+CHUNK_TOKENS = int(os.getenv('KRISHI_TRANSLATION_CHUNK_TOKENS', '160'))  # Source tokens per model input
+
+# Sentence end = . ! ? (plus closing quotes/brackets) followed by whitespace, or a line break
+_BOUNDARY_RE = re.compile(r'[.!?]+["\')\]]*(\s+)|\n\s*')
+# "1." step numbers, single initials and common abbreviations do not end a sentence
+_NOT_AN_END_RE = re.compile(r'(?:^|\s)(?:\d+|[A-Za-z]|e\.g|i\.e|etc|approx|Dr|Mr|Mrs|No|vs)\.$')
+# "1." / "2)" / "-" / "•" step markers are kept as-is, so a step is translated (and reused) whatever its number
+_MARKER_RE = re.compile(r'^((?:\d+[.)]|[-*•])\s+)')
+_CLAUSE_RE = re.compile(r'(?<=[;:,])\s+')
+
+# prefix + text + suffix of every segment, in order, rebuilds the source layout
+Segment = namedtuple('Segment', 'prefix text suffix')
+
+
+class SentenceSplitter:
+    """Cut a token stream into complete sentences as soon as each one ends."""
+
+    def __init__(self):
+        self.buffer = ''
+
+    def feed(self, delta):
+        """Add text; return the (sentence, separator) pairs it completed."""
+        self.buffer += delta
+        done, start = [], 0
+        for match in _BOUNDARY_RE.finditer(self.buffer):
+            if match.end() == len(self.buffer):
+                break  # The separator may continue in the next delta (e.g. a paragraph break)
+            head = self.buffer[start:match.start(1) if match.group(1) else match.start()]
+            if match.group(1) and _NOT_AN_END_RE.search(head):
+                continue
+            sentence = head.strip()
+            if sentence:
+                done.append((sentence, match.group(1) or match.group(0)))
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return done
+
+    def flush(self):
+        rest, self.buffer = self.buffer.strip(), ''
+        return [(rest, '')] if rest else []
+
+
+def approx_tokens(text):
+    return (len(text) + 3) // 4
+
+
+def pack(parts, max_tokens, count=approx_tokens):
+    """Greedily join consecutive parts (space-separated) into chunks of at most max_tokens."""
+    chunks, current = [], ''
+    for part in parts:
+        candidate = f'{current} {part}' if current else part
+        if current and count(candidate) > max_tokens:
+            chunks.append(current)
+            current = part
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_long(text, max_tokens=CHUNK_TOKENS, count=approx_tokens):
+    """A sentence too long for one model input, cut at clause boundaries, then between words."""
+    if count(text) <= max_tokens:
+        return [text]
+    chunks = []
+    for chunk in pack(_CLAUSE_RE.split(text), max_tokens, count):
+        chunks.extend(pack(chunk.split(' '), max_tokens, count) if count(chunk) > max_tokens else [chunk])
+    return chunks
+
+
+def segment_text(text, max_tokens=CHUNK_TOKENS, count=approx_tokens):
+    """
+    Sentences and numbered steps of `text`, each short enough to translate
+    without hitting the model's max_length. Step markers, line breaks and
+    paragraph breaks stay outside the text, so translations slot back in.
+    """
+    splitter = SentenceSplitter()
+    segments = []
+    for sentence, separator in splitter.feed(text or '') + splitter.flush():
+        match = _MARKER_RE.match(sentence)
+        marker = match.group(1) if match else ''
+        chunks = split_long(sentence[len(marker):], max_tokens, count)
+        for i, chunk in enumerate(chunks):
+            last = i == len(chunks) - 1
+            segments.append(Segment(marker if i == 0 else '', chunk, separator if last else ' '))
+    return segments
+
+
+def reassemble(segments, translations):
+    return ''.join(segment.prefix + translated + segment.suffix for segment, translated in zip(segments, translations))
@@ -0,0 +1,119 @@
+# utils/singleflight.py – Coalesce Identical In-Flight Calls (One Upstream Call, Shared Result)
+import os
+import threading
+from collections import Counter
+
+SINGLEFLIGHT_TIMEOUT = float(os.getenv('KRISHI_SINGLEFLIGHT_TIMEOUT', '120'))  # Seconds a follower waits
+
+
+class Call:
+    """One in-flight call. The leader settles it; followers block in wait()."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+    def resolve(self, result):
+        self.result = result
+        self._done.set()
+
+    def fail(self, error):
+        self.error = error
+        self._done.set()
+
+    def wait(self, timeout=SINGLEFLIGHT_TIMEOUT):
+        """Leader's result, or its exception re-raised; TimeoutError if it takes longer than `timeout`."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Shared request still running after {timeout:g}s")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Process-wide request coalescing. While a call for `key` is running, identical
+    calls wait for it instead of starting their own; everyone gets the same result,
+    or the same exception. Nothing is cached once the call finishes.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def join(self, key):
+        """(call, is_leader). The leader must settle the call and then forget(key)."""
+        with self._lock:
+            self.counts['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.counts['collapsed'] += 1
+                return call, False
+            call = self._calls[key] = Call()
+            self.counts['executed'] += 1
+            return call, True
+
+    def forget(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def follow(self, call, timeout=SINGLEFLIGHT_TIMEOUT):
+        try:
+            return call.wait(timeout)
+        except TimeoutError:
+            with self._lock:
+                self.counts['timeouts'] += 1
+            raise
+        except Exception:
+            with self._lock:
+                self.counts['shared_errors'] += 1
+            raise
+
+    def do(self, key, fn, timeout=SINGLEFLIGHT_TIMEOUT):
+        call, leader = self.join(key)
+        if not leader:
+            return self.follow(call, timeout)
+        try:
+            result = fn()
+        except BaseException as e:
+            call.fail(e if isinstance(e, Exception) else RuntimeError("Shared request was interrupted"))
+            raise
+        else:
+            call.resolve(result)
+            return result
+        finally:
+            self.forget(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'calls': self.counts['calls'],
+                'executed': self.counts['executed'],
+                'collapsed': self.counts['collapsed'],
+                'timeouts': self.counts['timeouts'],
+                'shared_errors': self.counts['shared_errors'],
+            }
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def get_flight(name):
+    """Named process-wide group ('advice', 'translation', ...)."""
+    group = _groups.get(name)
+    if group is None:
+        with _groups_lock:
+            group = _groups.setdefault(name, SingleFlight(name))
+    return group
+
+
+def flight_stats():
+    with _groups_lock:
+        return {name: group.stats() for name, group in _groups.items()}
@@ -0,0 +1,101 @@
+# utils/streaming.py – Streamed Chat Completions with Time-to-First-Token Metrics
+import threading
+import time
+from collections import deque
+
+
+class GenerationStats:
+    """Timing for one streamed completion (chunks ≈ tokens for HF text-generation streams)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self.tokens = 0
+        self.completed = False  # False if the stream errored or was abandoned part-way
+        self.text = ''
+
+    @property
+    def ttft(self):
+        return None if self.first_token_at is None else self.first_token_at - self.started
+
+    @property
+    def tokens_per_sec(self):
+        if self.first_token_at is None or self.finished_at is None or self.tokens < 2:
+            return None
+        elapsed = self.finished_at - self.first_token_at
+        return (self.tokens - 1) / elapsed if elapsed > 0 else None
+
+    def summary(self):
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "n/a"
+        tps = f"{self.tokens_per_sec:.1f} tok/s" if self.tokens_per_sec else "n/a"
+        return f"First token {ttft} · {tps} · {self.tokens} tokens" + ("" if self.completed else " (stopped early)")
+
+
+# Recent requests, process-wide, for dashboards / load runs
+_recent = deque(maxlen=500)
+_recent_lock = threading.Lock()
+
+
+def record(stats):
+    with _recent_lock:
+        _recent.append((stats.ttft, stats.tokens_per_sec, stats.completed))
+
+
+def recent_metrics():
+    """p50/p95 time-to-first-token and mean tokens/sec over the last 500 streamed requests."""
+    with _recent_lock:
+        rows = list(_recent)
+    ttfts = sorted(t for t, _, _ in rows if t is not None)
+    rates = [r for _, r, _ in rows if r]
+
+    def pct(values, q):
+        return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+    return {
+        'requests': len(rows),
+        'ttft_p50': pct(ttfts, 0.50),
+        'ttft_p95': pct(ttfts, 0.95),
+        'tokens_per_sec_mean': sum(rates) / len(rates) if rates else None,
+        'stopped_early': sum(1 for _, _, done in rows if not done),
+    }
+
+
+def track_stream(deltas, stats, on_finish=None):
+    """
+    Pass text deltas through while filling `stats`. on_finish(text, stats) runs
+    exactly once however the stream ends – normally, on an upstream error, or when
+    the consumer stops early (rerun, navigation) – so the partial answer is never lost.
+    """
+    parts = []
+    try:
+        for delta in deltas:
+            if not delta:
+                continue
+            if stats.first_token_at is None:
+                stats.first_token_at = time.perf_counter()
+            stats.tokens += 1
+            parts.append(delta)
+            yield delta
+        stats.completed = True
+    finally:
+        stats.finished_at = time.perf_counter()
+        stats.text = ''.join(parts).strip()
+        record(stats)
+        if on_finish is not None:
+            on_finish(stats.text, stats)
+
+
+def _chat_deltas(client, messages, params):
+    for chunk in client.chat.completions.create(messages=messages, stream=True, **params):
+        yield chunk.choices[0].delta.content if chunk.choices else None
+
+
+def stream_chat_completion(client, messages, stats, on_finish=None, endpoint=None, **params):
+    """
+    Yield text deltas from client.chat.completions.create(stream=True), tracked as in track_stream.
+    With a resilience Endpoint the call goes through its circuit breaker and pre-first-token retries.
+    """
+    if endpoint is None:
+        return track_stream(_chat_deltas(client, messages, params), stats, on_finish)
+    return track_stream(endpoint.stream(lambda timeout: _chat_deltas(client, messages, params)), stats, on_finish)
@@ -0,0 +1,55 @@
+# utils/tokens.py – Token Counting with the Model's Own Tokenizer (Character Fallback)
+import os
+import threading
+
+TOKENIZER_NAME = os.getenv('KRISHI_TOKENIZER', os.getenv('KRISHI_HF_MODEL', 'HuggingFaceTB/SmolLM3-3B'))
+
+
+class TokenCounter:
+    """
+    Counts with the model's own tokenizer (only the small tokenizer files are
+    downloaded, once). Falls back to ~4 characters per token if it can't be loaded,
+    which over-counts slightly for English, so budgets stay safe.
+    """
+
+    def __init__(self, name=TOKENIZER_NAME):
+        self.name = name
+        self._tokenizer = None
+        self._tried = False
+        self._lock = threading.Lock()
+
+    @property
+    def tokenizer(self):
+        if not self._tried:
+            with self._lock:
+                if not self._tried:
+                    try:
+                        from transformers import AutoTokenizer
+                        self._tokenizer = AutoTokenizer.from_pretrained(self.name)
+                    except Exception:
+                        self._tokenizer = None
+                    self._tried = True
+        return self._tokenizer
+
+    @property
+    def exact(self):
+        return self.tokenizer is not None
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return (len(text) + 3) // 4
+
+    def truncate(self, text, max_tokens):
+        """Longest prefix of `text` within max_tokens (cut at a word boundary), with an ellipsis if cut."""
+        if self.count(text) <= max_tokens:
+            return text
+        if self.tokenizer is not None:
+            ids = self.tokenizer.encode(text, add_special_tokens=False)[:max(max_tokens - 1, 0)]
+            cut = self.tokenizer.decode(ids)
+        else:
+            cut = text[:max(max_tokens - 1, 0) * 4]
+        cut = cut.rsplit(' ', 1)[0] if ' ' in cut else cut
+        return cut.rstrip(' ,;:') + '…'
@@ -0,0 +1,236 @@
+# utils/translation.py – English → Malayalam Translation (HF API First, Local opus-mt Fallback)
+import json
+import logging
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from utils.batch_translator import get_batch_translator
+from utils.tokens import TokenCounter
+from utils.model_registry import get_registry
+from utils.resilience import get_endpoint
+from utils.segmenter import CHUNK_TOKENS, SentenceSplitter, reassemble, segment_text
+from utils.singleflight import get_flight
+
+try:
+    from backend.translation_memory import get_translation_memory  # Persistent sentence → translation store
+    TM_AVAILABLE = True
+except ImportError:
+    TM_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_MODEL = "Helsinki-NLP/opus-mt-en-ml"
+TRANSLATION_WORKERS = int(os.getenv('KRISHI_TRANSLATION_WORKERS', '3'))  # Sentences translated in parallel
+TRANSLATOR_MODE = os.getenv('KRISHI_TRANSLATOR_MODE', 'fp32').lower()        # CPU: fp32 | int8 | onnx (needs optimum)
+ONNX_CACHE_DIR = os.getenv('KRISHI_ONNX_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'krishi_sakhi', 'onnx'))
+
+_source_tokens = TokenCounter(TRANSLATION_MODEL)  # Marian tokenizer, so chunks are measured as the model sees them
+
+
+def _onnx_translator(device, cache_dir=ONNX_CACHE_DIR):
+    """opus-mt exported to ONNX once, then loaded from the cached export on later starts."""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer, pipeline
+    path = os.path.join(cache_dir, TRANSLATION_MODEL.replace('/', '--'))
+    if not os.path.isfile(os.path.join(path, 'config.json')):
+        staging = f"{path}.tmp-{os.getpid()}"
+        ORTModelForSeq2SeqLM.from_pretrained(TRANSLATION_MODEL, export=True).save_pretrained(staging)
+        AutoTokenizer.from_pretrained(TRANSLATION_MODEL).save_pretrained(staging)
+        try:
+            os.replace(staging, path)  # Atomic: another process never sees a half-written export
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)  # Another process finished first
+    return pipeline("translation", model=ORTModelForSeq2SeqLM.from_pretrained(path),
+                    tokenizer=AutoTokenizer.from_pretrained(path), device=device)
+
+
+def build_translator(mode=TRANSLATOR_MODE, device=None):
+    """
+    Translation pipeline in `mode` (fp32 | int8 | onnx); raises if it can't be built.
+    device None = CUDA (always fp16) when available, else CPU in the requested mode.
+    """
+    import torch
+    from transformers import pipeline
+    if device is None:
+        device = 0 if torch.cuda.is_available() else -1
+    if device != -1:
+        return pipeline("translation", model=TRANSLATION_MODEL, device=device, torch_dtype=torch.float16)
+    if mode == 'onnx':
+        return _onnx_translator(device)
+    pipe = pipeline("translation", model=TRANSLATION_MODEL, device=device)
+    if mode == 'int8':
+        # Linear layers (nearly all of Marian's compute) to int8 weights, activations quantized on the fly
+        pipe.model = torch.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipe
+
+
+def _load_translator_model():
+    # Runs on whichever thread first needs the model (often the batch worker): log, don't st.*
+    try:
+        return build_translator()
+    except Exception as load_e:
+        if TRANSLATOR_MODE == 'fp32':
+            raise
+        logger.warning("Translator mode %r unavailable (%s); using fp32", TRANSLATOR_MODE, load_e)
+        return build_translator('fp32')
+
+
+get_registry().register('translator', _load_translator_model)  # One copy per process (downloads ~300MB first time)
+
+
+def load_translator():
+    """
+    The shared translator pipeline, or None if it can't be loaded. Holds no
+    registry reference: code that runs the model should use
+    `with get_registry().use('translator') as pipe:` so it isn't unloaded mid-use.
+    """
+    try:
+        with get_registry().use('translator') as pipe:
+            return pipe
+    except Exception as load_e:
+        st.error(f"Model load failed: {str(load_e)}")
+        return None
+
+
+def _translate_batch_local(sentences):
+    # Requests from every session share one batching worker (the pipeline itself isn't thread-safe);
+    # submitted together, the sentences go through in one forward pass
+    batcher = get_batch_translator('translator')
+    futures = [batcher.submit(sentence) for sentence in sentences]
+    return [future.result() for future in futures]
+
+
+def translate_local(text, src_lang="en", tgt_lang="ml"):
+    try:
+        return translate_with_memory(text, _translate_batch_local)
+    except Exception as local_e:
+        st.warning(f"Local translation error: {str(local_e)}")
+        return text
+
+
+def translate_api(client, text):
+    """
+    Hosted opus-mt with the hf-translation endpoint's retries, hedging and breaker
+    (the client carries the timeout). `text` may be a list, translated in one request.
+    Raises on failure so callers can fall back.
+    """
+    return get_endpoint('hf-translation').call(lambda timeout: _post_translation(client, text))
+
+
+def _post_translation(client, text):
+    result = client.post(model=TRANSLATION_MODEL, json={"inputs": text})
+    if isinstance(result, (bytes, str)):  # Newer huggingface_hub returns raw bytes
+        result = json.loads(result)
+    if isinstance(text, list):
+        if isinstance(result, list) and len(result) == len(text) and all(r.get('translation_text') for r in result):
+            return [r['translation_text'] for r in result]
+    elif isinstance(result, list) and result and result[0].get('translation_text'):
+        return result[0]['translation_text']
+    raise ValueError("Invalid translation response")
+
+
+def _translate_batch(sentences, client, failures):
+    """Hosted API first, local model if it fails; raises only if neither can translate."""
+    if client is not None:
+        try:
+            return translate_api(client, sentences)
+        except Exception as api_e:
+            failures.append(str(api_e))
+    return _translate_batch_local(sentences)
+
+
+def translate_to_malayalam(text, client=None):
+    """Translate once: hosted API when a client is available, otherwise (or on failure) the local model."""
+    if not text:
+        return text
+    # Identical text already being translated for another session → share that call
+    return get_flight('translation').do(text, lambda: _translate_text(text, client))
+
+
+def _translate_text(text, client):
+    failures = []
+    try:
+        result = translate_with_memory(text, lambda sentences: _translate_batch(sentences, client, failures))
+    except Exception as local_e:
+        failures.append(str(local_e))
+        result = text
+    if failures:
+        st.warning(f"Some sentences used the local translator or stayed in English ({failures[0]}).")
+    return result
+
+
+# ---------------------------------------------------------------- sentence pipeline
+
+def translate_with_memory(text, translate_batch):
+    """
+    Split `text` into sentences/steps (over-long ones into CHUNK_TOKENS chunks),
+    reuse every segment the translation memory already knows and send only the
+    misses – all together, one call – to translate_batch(list) -> list of
+    translations. Failed batches raise and nothing is stored, so English never
+    enters the memory. Lists and paragraphs come back in their original layout.
+    """
+    segments = segment_text(text, CHUNK_TOKENS, _source_tokens.count)
+    sentences = list(dict.fromkeys(segment.text for segment in segments if segment.text))
+    memory = get_translation_memory(TRANSLATION_MODEL) if TM_AVAILABLE else None
+    found = memory.get_many(sentences) if memory else {}
+    misses = [sentence for sentence in sentences if sentence not in found]
+    if misses:
+        translated = translate_batch(misses)
+        found.update(zip(misses, translated))
+        if memory:
+            memory.put_many(zip(misses, translated))
+    return reassemble(segments, [found.get(segment.text, segment.text) for segment in segments])
+
+
+def memory_stats():
+    return get_translation_memory(TRANSLATION_MODEL).stats() if TM_AVAILABLE else None
+
+
+def _translate_sentence(text, client, failures):
+    return get_flight('translation').do(text, lambda: _translate_quietly(text, client, failures))
+
+
+def _translate_quietly(text, client, failures):
+    # Runs on a worker thread: no st.* calls here, failures are reported by the caller
+    try:
+        return translate_with_memory(text, lambda sentences: _translate_batch(sentences, client, failures))
+    except Exception as local_e:
+        failures.append(str(local_e))
+        return text
+
+
+def translate_stream(deltas, client=None, workers=TRANSLATION_WORKERS):
+    """
+    Generate-then-translate, pipelined: each English sentence is handed to a
+    translation worker the moment the LLM finishes it, while generation carries on.
+    Yields Malayalam sentences in their original order as soon as each is ready
+    (feed straight into st.write_stream). Every sentence is translated exactly once.
+    """
+    splitter = SentenceSplitter()
+    pending = deque()  # Futures in sentence order
+    failures = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='translate') as pool:
+        def submit(pairs):
+            for sentence, separator in pairs:
+                pending.append((pool.submit(_translate_sentence, sentence, client, failures), separator))
+
+        try:
+            for delta in deltas:
+                if delta:
+                    submit(splitter.feed(delta))
+                while pending and pending[0][0].done():  # Emit finished sentences without waiting
+                    future, separator = pending.popleft()
+                    yield future.result() + separator
+            submit(splitter.flush())
+            while pending:
+                future, separator = pending.popleft()
+                yield future.result() + separator
+        finally:
+            for future, _ in pending:
+                future.cancel()
+    if failures:
+        st.warning(f"Some sentences used the local translator or stayed in English ({failures[0]}).")
@@ -0,0 +1,137 @@
+# utils/warmup.py – Background Warm-Up at Server Start (Translator, Clients, Heavy Imports) with Readiness Status
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv('KRISHI_WARMUP', '1') == '1'
+WARMUP_TRANSLATOR = os.getenv('KRISHI_WARMUP_TRANSLATOR', '1') == '1'  # ~300MB model; off for API-only deployments
+WARMUP_TRANSLATE_TIMEOUT = float(os.getenv('KRISHI_WARMUP_TRANSLATE_TIMEOUT', '300'))  # Includes the model load
+WARMUP_IMPORTS = ('speech_recognition', 'pydub', 'folium', 'streamlit_folium', 'huggingface_hub')
+
+
+def _warm_database():
+    from backend.connection import get_pool
+    with get_pool().connection():
+        pass  # First checkout applies pending migrations
+
+
+def _warm_knowledge_base():
+    from backend.advisory import get_knowledge_base
+    get_knowledge_base()
+
+
+def _warm_imports():
+    from utils.lazy import lazy_import, module_available, preload
+    names = [name for name in WARMUP_IMPORTS if module_available(name)]
+    for name in names:
+        lazy_import(name)
+    errors = preload(names)
+    if errors:
+        raise ImportError('; '.join(f"{n}: {e}" for n, e in errors.items()))
+
+
+def _warm_clients():
+    from utils.advice import get_engine, get_hf_client
+    get_hf_client('hf-chat')
+    get_hf_client('hf-translation')
+    backend = get_engine().backend
+    key = getattr(backend, 'registry_key', None)
+    if key:  # Local LLM backend: load its model too
+        from utils.model_registry import get_registry
+        with get_registry().use(key):
+            pass
+
+
+def _warm_translator():
+    import utils.translation  # noqa: F401 – registers the 'translator' loader
+    from utils.batch_translator import get_batch_translator
+    # Through the batch worker, so the warm-up pass is serialised with real traffic
+    # instead of racing it on the same pipeline
+    get_batch_translator('translator').translate("Warm-up.", timeout=WARMUP_TRANSLATE_TIMEOUT)
+
+
+class WarmUp:
+    """
+    Runs each task once, in order, on a daemon thread, so the first farmer
+    doesn't pay for model loads and imports. Tasks are independent: one failing
+    only marks itself failed. Pages read status() to show readiness; nothing
+    waits on it, a cold path still loads on demand.
+    """
+
+    def __init__(self, tasks):
+        self.tasks = tasks  # [(name, fn)]
+        self._state = {name: {'state': 'pending', 'seconds': None, 'error': None} for name, _ in tasks}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.started_at = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        for name, fn in self.tasks:
+            with self._lock:
+                self._state[name]['state'] = 'running'
+            started = time.perf_counter()
+            try:
+                fn()
+                state, error = 'ready', None
+            except Exception as e:
+                state, error = 'failed', str(e)
+                logger.warning("Warm-up task %s failed: %s", name, e)
+            with self._lock:
+                self._state[name].update(state=state, seconds=round(time.perf_counter() - started, 2), error=error)
+
+    def ready(self, name=None):
+        """True once `name` (or every task) has finished, successfully or not."""
+        with self._lock:
+            states = [self._state[name]] if name else list(self._state.values())
+            return all(s['state'] in ('ready', 'failed') for s in states)
+
+    def status(self):
+        with self._lock:
+            tasks = {name: dict(s) for name, s in self._state.items()}
+            done = [s for s in tasks.values() if s['state'] in ('ready', 'failed')]
+            if self._thread is None:
+                overall = 'not started'
+            elif len(done) < len(tasks):
+                overall = 'warming'
+            else:
+                overall = 'degraded' if any(s['state'] == 'failed' for s in tasks.values()) else 'ready'
+            elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+            running = next((name for name, s in tasks.items() if s['state'] == 'running'), None)
+            return {'state': overall, 'running': running, 'elapsed_s': round(elapsed, 1), 'tasks': tasks}
+
+
+_warmup = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup():
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                tasks = [('database', _warm_database), ('knowledge-base', _warm_knowledge_base),
+                         ('imports', _warm_imports), ('clients', _warm_clients)]
+                if WARMUP_TRANSLATOR:
+                    tasks.append(('translator', _warm_translator))
+                _warmup = WarmUp(tasks)
+    return _warmup
+
+
+def start_warmup():
+    """Start the process-wide warm-up (first call only; KRISHI_WARMUP=0 disables it). Returns the WarmUp."""
+    warmup = get_warmup()
+    if WARMUP_ENABLED:
+        warmup.start()
+    return warmup